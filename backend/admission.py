@@ -0,0 +1,273 @@
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume one token; returns 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class BucketTable:
+    """Token buckets per key, bounded by evicting the least recently used key"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self.rejected = 0
+
+    def take(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        retry_after = bucket.take()
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RouteLimiter:
+    """Concurrency limit with a short bounded wait queue for one route class"""
+
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.shed += 1
+            return False
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                return False
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "shed": self.shed,
+        }
+
+
+class AdmissionController:
+    def __init__(self):
+        self.queue_timeout = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_SECONDS', '2'))
+        self.retry_after_seconds = int(os.environ.get('ADMISSION_RETRY_AFTER_SECONDS', '1'))
+        self.limiters = {
+            "contact_write": RouteLimiter(
+                "contact_write",
+                int(os.environ.get('ADMISSION_CONTACT_CONCURRENCY', '32')),
+                int(os.environ.get('ADMISSION_CONTACT_QUEUE', '64')),
+            ),
+            "write": RouteLimiter(
+                "write",
+                int(os.environ.get('ADMISSION_WRITE_CONCURRENCY', '32')),
+                int(os.environ.get('ADMISSION_WRITE_QUEUE', '64')),
+            ),
+            "read": RouteLimiter(
+                "read",
+                int(os.environ.get('ADMISSION_READ_CONCURRENCY', '64')),
+                int(os.environ.get('ADMISSION_READ_QUEUE', '128')),
+            ),
+        }
+
+        # Queued or in-flight emails, two per submission
+        self.max_pending_emails = int(os.environ.get('ADMISSION_MAX_PENDING_EMAILS', '400'))
+        self.pending_emails = 0
+        self.email_shed = 0
+
+        max_keys = int(os.environ.get('ADMISSION_BUCKET_KEYS', '10000'))
+        # Contact POSTs per client IP and per submitted email address
+        self.ip_buckets = BucketTable(
+            float(os.environ.get('ADMISSION_IP_RATE_PER_MINUTE', '12')) / 60,
+            float(os.environ.get('ADMISSION_IP_BURST', '5')),
+            max_keys,
+        )
+        self.email_buckets = BucketTable(
+            float(os.environ.get('ADMISSION_EMAIL_RATE_PER_HOUR', '10')) / 3600,
+            float(os.environ.get('ADMISSION_EMAIL_BURST', '3')),
+            max_keys,
+        )
+        # Behind Railway/Render the peer address is the proxy; the proxy appends
+        # the real client as the last X-Forwarded-For entry
+        self.trust_forwarded_for = os.environ.get('ADMISSION_TRUST_FORWARDED_FOR', 'true').lower() == 'true'
+
+    @staticmethod
+    def classify(method: str, path: str) -> Optional[str]:
+        if not path.startswith("/api/") or method == "OPTIONS":
+            return None
+        if path == "/api/contact/stream":
+            # Long-lived SSE connections would pin a slot for their whole lifetime
+            return None
+        if method == "POST" and path == "/api/contact":
+            return "contact_write"
+        if method in ("GET", "HEAD"):
+            return "read"
+        return "write"
+
+    def client_ip(self, scope) -> str:
+        if self.trust_forwarded_for:
+            forwarded = Headers(scope=scope).get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[-1].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def check_contact(self, email: str):
+        """Per-address rate limit and background email cap, before any write happens"""
+        if self.pending_emails >= self.max_pending_emails:
+            self.email_shed += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+        retry_after = self.email_buckets.take(email.strip().lower())
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many submissions for this email address",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    def email_task_started(self):
+        self.pending_emails += 1
+
+    def email_task_finished(self):
+        self.pending_emails -= 1
+
+    def stats(self) -> dict:
+        return {
+            "routes": {name: limiter.stats() for name, limiter in self.limiters.items()},
+            "emails": {
+                "pending": self.pending_emails,
+                "max_pending": self.max_pending_emails,
+                "shed": self.email_shed,
+            },
+            "rate_limits": {
+                "ip": {"tracked": len(self.ip_buckets), "rejected": self.ip_buckets.rejected},
+                "email": {"tracked": len(self.email_buckets), "rejected": self.email_buckets.rejected},
+            },
+        }
+
+
+async def _reject(send, status: int, detail: str, retry_after: int):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds load before a request reaches the API router"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if route_class == "contact_write":
+            retry_after = self.controller.ip_buckets.take(self.controller.client_ip(scope))
+            if retry_after:
+                await _reject(send, 429, "Too many requests", math.ceil(retry_after))
+                return
+
+        limiter = self.controller.limiters[route_class]
+        if not await limiter.acquire(self.controller.queue_timeout):
+            logger.warning("Shed %s request: %d in flight, %d queued", route_class, limiter.in_flight, limiter.waiting)
+            await _reject(send, 503, "Server is busy, please retry shortly", self.controller.retry_after_seconds)
+            return
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                limiter.release()
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                # Free the slot once the response is out; background email work
+                # that runs afterwards is bounded by the pending email cap instead
+                release()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            release()
+
+
+# Create a singleton instance
+admission_controller = AdmissionController()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+SendGrid event webhook replay benchmark.
+
+Builds a replay fixture of event batches (processed/delivered/open/bounce for
+SUBMISSIONS * 2 messages, shuffled into BATCH_SIZE batches like SendGrid
+posts them), replays it against POST /api/email/events in-process and waits
+for the ingestor to fold everything into the submissions.
+
+Runs against the in-memory repository, then against Mongo when MONGO_URL is
+reachable (a scratch database is used and dropped afterwards). Only the Mongo
+run includes the costly parts: the positional $elemMatch bulk_write and the
+raw insert_many into email_events.
+
+Run from backend/:  python benchmarks/bench_email_events.py [fixture.json]
+Pass a path to write the fixture there (or replay it if it already exists).
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# The app's own repository is unused: each run hands the ingestor its own
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# One client stands in for SendGrid, so its IP must not be rate limited
+os.environ.setdefault("ADMISSION_WRITE_CONCURRENCY", "1000")
+
+import httpx  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+import server  # noqa: E402
+from email_events import email_event_ingestor  # noqa: E402
+from repository import InMemorySubmissionRepository, MongoSubmissionRepository  # noqa: E402
+from retention import retention_service  # noqa: E402
+
+SUBMISSIONS = 5000
+BATCH_SIZE = 1000
+CONCURRENT_POSTS = 8
+
+
+def build_fixture(message_ids: list) -> list:
+    base = int(time.time()) - 3600
+    events = []
+    for message_id in message_ids:
+        sg_message_id = f"{message_id}.filterdrecv-{random.randint(1, 99)}.{random.randint(0, 1 << 30)}.0"
+        t = base + random.randint(0, 600)
+        sequence = ["processed", "delivered", "open"] if random.random() > 0.05 else ["processed", "bounce"]
+        for offset, event in enumerate(sequence):
+            events.append({
+                "email": f"user-{message_id[:6]}@example.com",
+                "timestamp": t + offset * 5,
+                "event": event,
+                "sg_event_id": uuid.uuid4().hex,
+                "sg_message_id": sg_message_id,
+                "smtp-id": f"<{message_id}@example.com>",
+            })
+    random.shuffle(events)
+    return [events[i:i + BATCH_SIZE] for i in range(0, len(events), BATCH_SIZE)]
+
+
+async def seed(repo) -> list:
+    submission_ids = [str(uuid.uuid4()) for _ in range(SUBMISSIONS)]
+    await repo.insert_many([
+        {"id": submission_id, "timestamp": f"2025-01-01T00:00:{i % 60:02d}+00:00", "status": "pending"}
+        for i, submission_id in enumerate(submission_ids)
+    ])
+    recorded = [(submission_id, kind, uuid.uuid4().hex[:22]) for submission_id in submission_ids for kind in ("admin", "user")]
+    for start in range(0, len(recorded), 500):
+        await asyncio.gather(*(repo.record_email_message(*args) for args in recorded[start:start + 500]))
+    return [message_id for _, _, message_id in recorded]
+
+
+def load_batches(fixture_path, message_ids: list) -> list:
+    if fixture_path and os.path.exists(fixture_path):
+        with open(fixture_path, encoding="utf-8") as f:
+            print(f"replaying {fixture_path} (message ids will not match this run's submissions)")
+            return json.load(f)
+    batches = build_fixture(message_ids)
+    if fixture_path:
+        with open(fixture_path, "w", encoding="utf-8") as f:
+            json.dump(batches, f)
+    return batches
+
+
+async def replay(repo, db, fixture_path):
+    print(f"{repo.name}:")
+    message_ids = await seed(repo)
+    batches = load_batches(fixture_path, message_ids)
+    bodies = [json.dumps(batch).encode() for batch in batches]
+    total = sum(len(batch) for batch in batches)
+
+    email_event_ingestor.__init__()
+    ingest = asyncio.create_task(email_event_ingestor.run(repo, db))
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(CONCURRENT_POSTS)
+
+        async def post(body: bytes):
+            async with semaphore:
+                response = await client.post("/api/email/events", content=body, headers={"content-type": "application/json"})
+                assert response.status_code == 202, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(body) for body in bodies))
+        accepted = time.perf_counter() - start
+        while email_event_ingestor.applied < total:
+            await asyncio.sleep(0.001)
+        applied = time.perf_counter() - start
+
+    ingest.cancel()
+    await asyncio.gather(ingest, return_exceptions=True)
+    assert email_event_ingestor.failed_batches == 0 and email_event_ingestor.raw_store_failures == 0
+    final = sum(
+        1 for doc in await repo.list(limit=SUBMISSIONS) for message in doc.get("email_messages", [])
+        if message["status"] in ("open", "bounce")
+    )
+    print(f"  {total} events in {len(bodies)} batches")
+    print(f"  acknowledged in {accepted * 1000:8.1f} ms  {total / accepted:10.0f} events/s")
+    print(f"  applied in      {applied * 1000:8.1f} ms  {total / applied:10.0f} events/s")
+    print(f"  messages at their final status: {final}/{len(message_ids)}")
+
+
+async def mongo_database():
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'), serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"mongo: skipped ({type(e).__name__})")
+        client.close()
+        return None, None
+    db = client[f"bench_email_events_{uuid.uuid4().hex[:8]}"]
+    # The production indexes, including email_messages.message_id behind the positional updates
+    await retention_service.ensure_collections(db)
+    await email_event_ingestor.ensure_indexes(db)
+    return client, db
+
+
+async def main():
+    fixture_path = sys.argv[1] if len(sys.argv) > 1 else None
+    await replay(InMemorySubmissionRepository(), None, fixture_path)
+
+    client, db = await mongo_database()
+    if db is not None:
+        try:
+            await replay(MongoSubmissionRepository(db), db, fixture_path)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
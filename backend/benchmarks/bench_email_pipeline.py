@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Email pipeline benchmark: 1k queued contact submissions (2k emails).
+
+SendGrid is replaced by an httpx MockTransport that answers 202 after
+BENCH_SEND_LATENCY_MS, so the real payload building and pooled client are
+exercised without network. Compares the old path (one background task per
+submission that renders, builds a dict and lets httpx serialize it, with a
+new client per send) against the dispatcher at several send concurrencies,
+and prints emails/second plus per-stage time per email. Fails if the default
+send concurrency (the admission pending-email cap) is slower than the old path.
+
+Run from backend/:  python benchmarks/bench_email_pipeline.py
+"""
+
+import os
+import sys
+import time
+import uuid
+import asyncio
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SENDGRID_API_KEY", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+
+from email_service import EmailService, SENDGRID_SEND_URL  # noqa: E402
+from email_dispatch import EmailDispatcher, STAGES  # noqa: E402
+
+SUBMISSIONS = 1000
+LATENCY = float(os.environ.get("BENCH_SEND_LATENCY_MS", "20")) / 1000
+CONCURRENCIES = (8, 32, 128, None)
+ADMIN_EMAIL = "admin@techyhive.test"
+
+
+async def fake_sendgrid(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(LATENCY)
+    return httpx.Response(202, headers={"X-Message-Id": uuid.uuid4().hex[:22]})
+
+
+def make_contact(i: int) -> dict:
+    return {
+        "name": f"Client {i}",
+        "email": f"client{i}@example.com",
+        "phone": "+91 98765 43210",
+        "project_type": "Web Development",
+        "domain": "E-commerce",
+        "deadline": "2 months",
+        "budget": "$5000-$10000",
+        "description": "Need a modern e-commerce website with payment integration. " * 4,
+    }
+
+
+async def legacy(service: EmailService) -> float:
+    """Previous behaviour: per-submission task, dict payload serialized by httpx, client per send"""
+    transport = httpx.MockTransport(fake_sendgrid)
+
+    async def send(to_email: str, subject: str, html: str):
+        payload = {
+            "personalizations": [{"to": [{"email": to_email}], "subject": subject}],
+            "from": {"email": service.from_email, "name": service.from_name},
+            "content": [{"type": "text/html", "value": html}],
+        }
+        headers = {"Authorization": f"Bearer {service.sendgrid_api_key}", "Content-Type": "application/json"}
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.post(SENDGRID_SEND_URL, json=payload, headers=headers)
+        return response.status_code == 202
+
+    async def submission(contact: dict):
+        admin_html = service.get_admin_notification_template(contact)
+        user_html = service.get_user_confirmation_template(contact["name"])
+        await asyncio.gather(
+            send(ADMIN_EMAIL, f"New Contact Form Submission from {contact['name']}", admin_html),
+            send(contact["email"], "We've Received Your Request - TechyHive", user_html),
+        )
+
+    contacts = [make_contact(i) for i in range(SUBMISSIONS)]
+    start = time.perf_counter()
+    await asyncio.gather(*(submission(contact) for contact in contacts))
+    return time.perf_counter() - start
+
+
+async def pipeline(concurrency: Optional[int]):
+    """None runs the dispatcher at its default concurrency"""
+    if concurrency is None:
+        os.environ.pop("EMAIL_SEND_CONCURRENCY", None)
+    else:
+        os.environ["EMAIL_SEND_CONCURRENCY"] = str(concurrency)
+    service = EmailService()
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(fake_sendgrid))
+    dispatcher = EmailDispatcher(service)
+    dispatcher._queue = asyncio.Queue()  # room for the whole burst
+    sent_ids = []
+
+    async def on_result(job, result):
+        sent_ids.append(result)
+
+    senders = asyncio.create_task(dispatcher.run(on_result))
+    contacts = [make_contact(i) for i in range(SUBMISSIONS)]
+
+    start = time.perf_counter()
+    for i, contact in enumerate(contacts):
+        dispatcher.submit(str(i), "admin", ADMIN_EMAIL, f"New Contact Form Submission from {contact['name']}",
+                          service.get_admin_notification_template, contact)
+        dispatcher.submit(str(i), "user", contact["email"], "We've Received Your Request - TechyHive",
+                          service.get_user_confirmation_template, contact["name"])
+    enqueued = time.perf_counter() - start
+    await dispatcher.join()
+    total = time.perf_counter() - start
+
+    senders.cancel()
+    await asyncio.gather(senders, return_exceptions=True)
+    await service.close()
+    assert len(sent_ids) == 2 * SUBMISSIONS and all(sent_ids), "lost or failed sends"
+    return total, enqueued, dispatcher
+
+
+async def main():
+    emails = 2 * SUBMISSIONS
+    print(f"{SUBMISSIONS} submissions, {emails} emails, simulated SendGrid latency {LATENCY * 1000:.0f} ms\n")
+
+    elapsed = await legacy(EmailService())
+    print(f"{'legacy (task per submission)':32s} {elapsed * 1000:9.1f} ms  {emails / elapsed:9.0f} emails/s")
+
+    for concurrency in CONCURRENCIES:
+        total, enqueued, dispatcher = await pipeline(concurrency)
+        label = f"pipeline, {dispatcher.concurrency} senders"
+        if concurrency is None:
+            label += " (default)"
+            assert total <= elapsed, f"default concurrency took {total * 1000:.1f} ms, legacy {elapsed * 1000:.1f} ms"
+        print(f"{label:32s} {total * 1000:9.1f} ms  {emails / total:9.0f} emails/s"
+              f"  (enqueue {enqueued * 1000:.1f} ms)")
+        per_email = "  ".join(
+            f"{stage} {dispatcher.stage_seconds[stage] / emails * 1e6:8.1f} us" for stage in STAGES
+        )
+        print(f"{'':32s} per email: {per_email}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
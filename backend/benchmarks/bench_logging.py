@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Event-loop stall benchmark: synchronous logging vs the queued log pipeline.
+
+A slow sink (each write sleeps SINK_DELAY_MS, like a blocked stdout pipe or
+slow disk) receives records from many concurrent "requests". A ticker task
+measures how late the loop wakes it up; that lateness is the stall that
+every in-flight request would feel.
+
+Run from backend/:  python benchmarks/bench_logging.py
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from log_pipeline import log_pipeline  # noqa: E402
+
+SINK_DELAY_MS = 2.0
+REQUESTS = 200
+LOGS_PER_REQUEST = 3
+TICK_MS = 1.0
+
+
+class SlowSink(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(SINK_DELAY_MS / 1000)
+        self.written += 1
+
+
+async def ticker(lags: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_MS / 1000
+        await asyncio.sleep(TICK_MS / 1000)
+        lags.append((loop.time() - expected) * 1000)
+
+
+async def fake_request(logger: logging.Logger, i: int):
+    for n in range(LOGS_PER_REQUEST):
+        logger.info("request %d stage %d for %s", i, n, "client@example.com")
+        await asyncio.sleep(0)
+
+
+async def run(logger: logging.Logger) -> list:
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(0.01)
+    await asyncio.gather(*(fake_request(logger, i) for i in range(REQUESTS)))
+    stop.set()
+    await tick
+    return lags
+
+
+def report(label: str, lags: list, elapsed: float):
+    lags = sorted(lags)
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    print(f"{label:<10} requests done in {elapsed * 1000:8.1f} ms | "
+          f"loop stall max {max(lags, default=0):8.2f} ms  p99 {p99:7.2f} ms  "
+          f"mean {statistics.mean(lags) if lags else 0:6.2f} ms")
+
+
+def main():
+    root = logging.getLogger()
+
+    # Before: handler writes synchronously on the event loop thread
+    sink = SlowSink()
+    root.handlers = [sink]
+    root.setLevel(logging.INFO)
+    start = time.perf_counter()
+    lags = asyncio.run(run(logging.getLogger("bench")))
+    report("sync", lags, time.perf_counter() - start)
+
+    # After: records are queued and the same slow sink runs on the listener thread
+    os.environ.setdefault("LOG_QUEUE_SIZE", "100000")
+    log_pipeline.configure()
+    queued_sink = SlowSink()
+    log_pipeline.listener.handlers = (queued_sink,)
+    start = time.perf_counter()
+    lags = asyncio.run(run(logging.getLogger("bench")))
+    report("queued", lags, time.perf_counter() - start)
+    log_pipeline.shutdown()
+    print(f"queued sink wrote {queued_sink.written} records after drain, dropped {log_pipeline.queue_handler.dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Storage repository benchmark: the same workload against every backend.
+
+Workload per backend: single inserts, one bulk insert, point reads by id,
+paginated newest-first listing and status updates. Mongo is included when
+MONGO_URL is reachable (a scratch database is used and dropped afterwards).
+
+Run from backend/:  python benchmarks/bench_storage.py
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import tempfile
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from repository import (  # noqa: E402
+    InMemorySubmissionRepository,
+    MongoSubmissionRepository,
+    SQLiteSubmissionRepository,
+)
+
+SINGLE_INSERTS = 500
+BULK_INSERT = 2000
+POINT_READS = 500
+PAGES = 50
+PAGE_SIZE = 50
+STATUS_UPDATES = 200
+
+
+def make_doc(i: int) -> dict:
+    ts = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=i)
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"Client {i}",
+        "email": f"client{i}@example.com",
+        "phone": "+1234567890",
+        "project_type": "Web Development",
+        "domain": "E-commerce",
+        "deadline": "2 months",
+        "budget": "$5000-$10000",
+        "description": "Need a modern e-commerce website with payment integration " * 4,
+        "timestamp": ts.isoformat(),
+        "status": "pending",
+    }
+
+
+async def timed(label: str, ops: int, coro_factory) -> None:
+    start = time.perf_counter()
+    await coro_factory()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<16} {ops:6d} ops  {elapsed * 1000:9.1f} ms  {ops / elapsed:10.0f} ops/s")
+
+
+async def run_workload(repo):
+    print(f"{repo.name}:")
+    await repo.setup()
+    docs = [make_doc(i) for i in range(SINGLE_INSERTS + BULK_INSERT)]
+    singles, bulk = docs[:SINGLE_INSERTS], docs[SINGLE_INSERTS:]
+    ids = [doc["id"] for doc in docs]
+
+    async def single_inserts():
+        for doc in singles:
+            await repo.insert(doc)
+
+    async def point_reads():
+        for submission_id in random.sample(ids, POINT_READS):
+            assert await repo.get(submission_id) is not None
+
+    async def pages():
+        for page in range(PAGES):
+            assert len(await repo.list(limit=PAGE_SIZE, offset=page * PAGE_SIZE)) == PAGE_SIZE
+
+    async def updates():
+        for submission_id in random.sample(ids, STATUS_UPDATES):
+            assert (await repo.update_status(submission_id, "contacted"))["status"] == "contacted"
+
+    await timed("insert", SINGLE_INSERTS, single_inserts)
+    await timed("insert_many", BULK_INSERT, lambda: repo.insert_many(bulk))
+    await timed("get", POINT_READS, point_reads)
+    await timed("list page", PAGES, pages)
+    await timed("update_status", STATUS_UPDATES, updates)
+    await repo.close()
+
+
+async def mongo_repository():
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'), serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"mongo: skipped ({type(e).__name__})")
+        client.close()
+        return None, None
+    db = client[f"bench_storage_{uuid.uuid4().hex[:8]}"]
+    await db.contact_submissions.create_index("id")
+    await db.contact_submissions.create_index([("timestamp", -1)])
+    return client, MongoSubmissionRepository(db)
+
+
+async def main():
+    await run_workload(InMemorySubmissionRepository())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await run_workload(SQLiteSubmissionRepository(os.path.join(tmp, "bench.db")))
+
+    client, repo = await mongo_repository()
+    if repo is not None:
+        try:
+            await run_workload(repo)
+        finally:
+            await client.drop_database(repo.db.name)
+            client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from typing import Callable, Optional
+
+import tracing
+from email_service import email_service, send_concurrency
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("render", "serialize", "queue", "send")
+
+
+class EmailJob:
+    __slots__ = ("submission_id", "kind", "to_email", "body", "enqueued_at", "context")
+
+    def __init__(self, submission_id: Optional[str], kind: str, to_email: str, body: bytes, context: contextvars.Context):
+        self.submission_id = submission_id
+        self.kind = kind
+        self.to_email = to_email
+        self.body = body
+        self.enqueued_at = time.perf_counter()
+        self.context = context
+
+
+class EmailDispatcher:
+    """Staged email pipeline: render and serialize when queued, post from a bounded pool of senders"""
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.concurrency = send_concurrency()
+        self.drain_seconds = float(os.environ.get('EMAIL_DRAIN_SECONDS', '10'))
+        self._queue = asyncio.Queue(maxsize=int(os.environ.get('EMAIL_QUEUE_SIZE', '2000')))
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, submission_id: Optional[str], kind: str, to_email: str, subject: str,
+               render: Callable[..., str], *render_args) -> bool:
+        """Render and serialize one email now and queue its bytes; False when the queue is full"""
+        start = time.perf_counter()
+        with tracing.span("email.render", template=kind):
+            html = render(*render_args)
+        rendered = time.perf_counter()
+        body = self.sender.build_payload(to_email, subject, html, tracing.get_request_id())
+        self.stage_seconds["render"] += rendered - start
+        self.stage_seconds["serialize"] += time.perf_counter() - rendered
+
+        # The send runs in the submitting request's context, so its span and request id line up
+        job = EmailJob(submission_id, kind, to_email, body, contextvars.copy_context())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error("Email queue full, dropped %s email to %s", kind, to_email)
+            return False
+        self.queued += 1
+        return True
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    async def run(self, on_result=None):
+        """Post queued emails with at most `concurrency` requests in flight, until cancelled"""
+        workers = [asyncio.create_task(self._worker(on_result)) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self, on_result):
+        while True:
+            job = await self._queue.get()
+            try:
+                await job.context.run(asyncio.create_task, self._send(job, on_result))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Email result handling failed: %s", e)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, job: EmailJob, on_result):
+        started = time.perf_counter()
+        self.stage_seconds["queue"] += started - job.enqueued_at
+        try:
+            with tracing.span("background.send_email", kind=job.kind):
+                result = await self.sender.post_payload(job.to_email, job.body)
+        except Exception as e:
+            result = e
+        self.stage_seconds["send"] += time.perf_counter() - started
+        if result and not isinstance(result, Exception):
+            self.sent += 1
+        else:
+            self.failed += 1
+        if on_result is not None:
+            await on_result(job, result)
+
+    async def join(self):
+        """Wait until every queued email has been posted and its result handled"""
+        await self._queue.join()
+
+    async def drain(self):
+        """Give queued emails a bounded chance to go out on shutdown"""
+        try:
+            await asyncio.wait_for(self.join(), timeout=self.drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Shutting down with %d emails still queued", self.backlog)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "backlog": self.backlog,
+            "concurrency": self.concurrency,
+            "stage_seconds": {stage: round(seconds, 6) for stage, seconds in self.stage_seconds.items()},
+        }
+
+
+# Create a singleton instance
+email_dispatcher = EmailDispatcher(email_service)
@@ -0,0 +1,223 @@
+import os
+import json
+import base64
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import load_der_public_key
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+EMAIL_EVENTS = "email_events"
+SIGNATURE_HEADER = "X-Twilio-Email-Event-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Twilio-Email-Event-Webhook-Timestamp"
+
+# Delivery-relevant SendGrid event types folded into submissions, by lifecycle rank.
+# Timestamps only have one-second resolution, so events in the same second are
+# ordered by rank: processed < deferred < delivered < open/click < terminal
+EVENT_RANK = {
+    "sent": 0,  # recorded by us when SendGrid accepted the message
+    "processed": 1,
+    "deferred": 2,
+    "delivered": 3,
+    "open": 4,
+    "click": 4,
+    "bounce": 5,
+    "dropped": 5,
+    "spamreport": 5,
+}
+TRACKED_EVENTS = set(EVENT_RANK) - {"sent"}
+
+
+def statuses_up_to(status: str) -> List[str]:
+    """Statuses an event with this status may replace when both share a timestamp"""
+    rank = EVENT_RANK[status]
+    return [name for name, other in EVENT_RANK.items() if other <= rank]
+
+
+def event_order(update: dict) -> tuple:
+    return update["event_at"], EVENT_RANK.get(update["status"], 0)
+
+
+def message_id_from_event(event: dict) -> Optional[str]:
+    """X-Message-Id returned by the send call is the prefix of the event's sg_message_id"""
+    sg_message_id = event.get("sg_message_id")
+    if not isinstance(sg_message_id, str) or not sg_message_id:
+        return None
+    return sg_message_id.split(".", 1)[0]
+
+
+def parse_events(body: bytes) -> Optional[List[dict]]:
+    try:
+        events = json.loads(body)
+    except ValueError:
+        return None
+    return events if isinstance(events, list) else None
+
+
+def fold_events(events: List[dict]) -> Dict[str, dict]:
+    """Latest tracked event per message id, so each message gets one update per batch"""
+    latest = {}
+    for event in events:
+        if not isinstance(event, dict) or event.get("event") not in TRACKED_EVENTS:
+            continue
+        message_id = message_id_from_event(event)
+        if message_id is None:
+            continue
+        event_at = event.get("timestamp")
+        if not isinstance(event_at, int):
+            continue
+        update = {"status": event["event"], "event_at": event_at}
+        current = latest.get(message_id)
+        if current is None or event_order(update) >= event_order(current):
+            latest[message_id] = update
+    return latest
+
+
+class EmailEventIngestor:
+    """Accepts SendGrid event webhook batches and applies them off the request path"""
+
+    def __init__(self):
+        self.public_key = None
+        public_key = os.environ.get('SENDGRID_WEBHOOK_PUBLIC_KEY')
+        if public_key:
+            self.public_key = load_der_public_key(base64.b64decode(public_key))
+        self.raw_ttl_seconds = int(os.environ.get('EMAIL_EVENT_TTL_DAYS', '30')) * 24 * 3600
+        # Queue of batches, not events; a full queue makes the webhook answer 503 so SendGrid retries
+        self._queue = asyncio.Queue(maxsize=int(os.environ.get('EMAIL_EVENT_QUEUE_BATCHES', '1000')))
+        # Batches whose submission update fails are retried with backoff, then given up on
+        self.max_attempts = int(os.environ.get('EMAIL_EVENT_MAX_ATTEMPTS', '5'))
+        self.retry_seconds = float(os.environ.get('EMAIL_EVENT_RETRY_SECONDS', '1'))
+        self.drain_seconds = float(os.environ.get('EMAIL_EVENT_DRAIN_SECONDS', '10'))
+        self.received = 0
+        self.applied = 0
+        self.retried_batches = 0
+        self.failed_batches = 0
+        self.raw_store_failures = 0
+
+    def verify(self, body: bytes, signature: Optional[str], timestamp: Optional[str]) -> bool:
+        """Check SendGrid's signed event webhook, when a verification key is configured"""
+        if self.public_key is None:
+            return True
+        if not signature or not timestamp:
+            return False
+        try:
+            self.public_key.verify(base64.b64decode(signature), timestamp.encode() + body, ec.ECDSA(hashes.SHA256()))
+        except (InvalidSignature, ValueError):
+            return False
+        return True
+
+    def submit(self, events: List[dict]) -> bool:
+        """Queue a parsed batch; False when the backlog is full"""
+        try:
+            self._queue.put_nowait((events, 1))
+        except asyncio.QueueFull:
+            return False
+        self.received += len(events)
+        return True
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    async def ensure_indexes(self, db):
+        try:
+            await db[EMAIL_EVENTS].create_index("received_at", expireAfterSeconds=self.raw_ttl_seconds, name="email_events_ttl")
+        except OperationFailure:
+            await db.command("collMod", EMAIL_EVENTS, index={"name": "email_events_ttl", "expireAfterSeconds": self.raw_ttl_seconds})
+        await db[EMAIL_EVENTS].create_index("sg_message_id", name="sg_message_id")
+
+    async def run(self, repository, db=None, on_applied=None):
+        """Drain queued batches until cancelled; coalesces whatever has piled up into one write"""
+        while True:
+            items = [await self._queue.get()]
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            # Only batches on the same attempt are merged, so fresh batches that queued up
+            # behind a retry do not inherit its attempt count
+            by_attempt = {}
+            for batch, attempt in items:
+                by_attempt.setdefault(attempt, []).extend(batch)
+            try:
+                for attempt, events in by_attempt.items():
+                    await self._process(events, attempt, repository, db, on_applied)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    async def _process(self, events: List[dict], attempt: int, repository, db, on_applied):
+        try:
+            updated, _ = await self.apply(events, repository, db)
+        except Exception as e:
+            # SendGrid already got its 202, so the batch is only lost once retries run out
+            if attempt >= self.max_attempts:
+                self.failed_batches += 1
+                logger.error("Giving up on %d email events after %d attempts: %s", len(events), attempt, e)
+                return
+            delay = self.retry_seconds * 2 ** (attempt - 1)
+            logger.warning("Failed to apply %d email events (attempt %d), retrying in %.1fs: %s",
+                           len(events), attempt, delay, e)
+            await asyncio.sleep(delay)
+            try:
+                self._queue.put_nowait((events, attempt + 1))
+                self.retried_batches += 1
+            except asyncio.QueueFull:
+                self.failed_batches += 1
+                logger.error("Event backlog full, dropped %d email events after a failed apply", len(events))
+            return
+        if updated and on_applied is not None:
+            on_applied()
+
+    async def apply(self, events: List[dict], repository, db=None) -> Tuple[bool, bool]:
+        """Apply a batch; returns (submissions updated, raw events stored)
+
+        A failed submission update raises so the batch can be retried. The raw copy is
+        best effort: its failure is logged and does not undo or retry the update.
+        """
+        updates = fold_events(events)
+        if updates and repository is not None:
+            await repository.apply_email_events(updates)
+        raw_stored = await self._store_raw(events, db)
+        self.applied += len(events)
+        return bool(updates), raw_stored
+
+    async def _store_raw(self, events: List[dict], db) -> bool:
+        raw = [event for event in events if isinstance(event, dict)]
+        # insert_many refuses an empty list
+        if db is None or not raw:
+            return False
+        received_at = datetime.now(timezone.utc)
+        try:
+            await db[EMAIL_EVENTS].insert_many([{**event, "received_at": received_at} for event in raw], ordered=False)
+        except Exception as e:
+            self.raw_store_failures += 1
+            logger.error("Failed to store %d raw email events: %s", len(raw), e)
+            return False
+        return True
+
+    async def drain(self):
+        """Give queued batches a bounded chance to be applied on shutdown"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Shutting down with %d email event batches still queued", self.backlog)
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "backlog_batches": self.backlog,
+            "retried_batches": self.retried_batches,
+            "failed_batches": self.failed_batches,
+            "raw_store_failures": self.raw_store_failures,
+        }
+
+
+# Create a singleton instance
+email_event_ingestor = EmailEventIngestor()
@@ -1,60 +1,105 @@
 import os
+import json
 import logging
+from typing import Optional
+
 import httpx
 
+import tracing
+from admission import admission_controller
+
 logger = logging.getLogger(__name__)
 
 
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+
+# Upper bound on the derived default, so a raised admission cap does not open thousands of connections
+MAX_DEFAULT_SEND_CONCURRENCY = 512
+
+
+def send_concurrency() -> int:
+    """Sends in flight (and pooled connections); sends are latency bound, so by
+    default every email admission lets through can be in flight at once"""
+    default = min(admission_controller.max_pending_emails, MAX_DEFAULT_SEND_CONCURRENCY)
+    return int(os.environ.get('EMAIL_SEND_CONCURRENCY', default))
+
+
 class EmailService:
     def __init__(self):
         self.sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
         self.from_email = os.environ.get('SMTP_FROM_EMAIL', 'techyhive03@gmail.com')
         self.from_name = os.environ.get('SMTP_FROM_NAME', 'TechyHive')
+        self.max_connections = send_concurrency()
+        self.timeout_seconds = float(os.environ.get('EMAIL_SEND_TIMEOUT_SECONDS', '10'))
+
+        # Constant parts of every request, built once per process
+        self._headers = {
+            "Authorization": f"Bearer {self.sendgrid_api_key}",
+            "Content-Type": "application/json",
+        }
+        from_json = json.dumps({"email": self.from_email, "name": self.from_name})
+        self._payload_to = b'{"personalizations":[{"to":[{"email":'
+        self._payload_subject = b'}],"subject":'
+        self._payload_content = f'}}],"from":{from_json},"content":[{{"type":"text/html","value":'.encode()
+        self._payload_request_id = b'}],"custom_args":{"request_id":'
+        self._client = None
+
+    def build_payload(self, to_email: str, subject: str, html_content: str, request_id: Optional[str] = None) -> bytes:
+        """SendGrid request body, serialized once; only the per-message fields are encoded here"""
+        parts = [
+            self._payload_to, json.dumps(to_email).encode(),
+            self._payload_subject, json.dumps(subject).encode(),
+            self._payload_content, json.dumps(html_content).encode(),
+        ]
+        if request_id:
+            # Echoed back by SendGrid in activity and event webhooks
+            parts += [self._payload_request_id, json.dumps(request_id).encode(), b"}}"]
+        else:
+            parts.append(b"}]}")
+        return b"".join(parts)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # One pooled client per process: keep-alive connections instead of a TLS handshake per email
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def send_email(self, to_email: str, subject: str, html_content: str):
         """Send an email using SendGrid API"""
+        return await self.post_payload(to_email, self.build_payload(to_email, subject, html_content, tracing.get_request_id()))
+
+    async def post_payload(self, to_email: str, body: bytes):
+        """POST a prebuilt request body; SendGrid's message id (or True) on success, False otherwise"""
         try:
             if not self.sendgrid_api_key:
                 logger.error("SendGrid API key not configured")
                 return False
 
-            url = "https://api.sendgrid.com/v3/mail/send"
-            headers = {
-                "Authorization": f"Bearer {self.sendgrid_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "personalizations": [
-                    {
-                        "to": [{"email": to_email}],
-                        "subject": subject
-                    }
-                ],
-                "from": {
-                    "email": self.from_email,
-                    "name": self.from_name
-                },
-                "content": [
-                    {
-                        "type": "text/html",
-                        "value": html_content
-                    }
-                ]
-            }
+            with tracing.span("sendgrid.send") as send_span:
+                response = await self._get_client().post(SENDGRID_SEND_URL, content=body, headers=self._headers)
+                if send_span is not None:
+                    send_span.set_attribute("http.status_code", response.status_code)
+
+            if response.status_code == 202:
+                logger.info("Email sent successfully to %s", to_email)
+                # SendGrid's id for the message; delivery webhook events reference it
+                return response.headers.get("X-Message-Id") or True
+            else:
+                # Only the head of the error body; SendGrid can return large payloads
+                logger.error("Failed to send email to %s: Status %s, Response: %.200s", to_email, response.status_code, response.text)
+                return False
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers)
-                
-                if response.status_code == 202:
-                    logger.info(f"Email sent successfully to {to_email}")
-                    return True
-                else:
-                    logger.error(f"Failed to send email to {to_email}: Status {response.status_code}, Response: {response.text}")
-                    return False
-                    
         except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {str(e)}")
+            logger.error("Failed to send email to %s: %s", to_email, e)
             return False
 
     def get_admin_notification_template(self, contact_data: dict) -> str:
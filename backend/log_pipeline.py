@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from tracing import RequestIdFilter
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+# uvicorn's default LOGGING_CONFIG gives these their own stdout handlers and propagate=False
+SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; the message is only interpolated here, on the listener thread"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of sub-WARNING records for selected (noisy) loggers"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None:
+            return True
+        return random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Skip the eager getMessage()/format() of the stock handler; the listener formats lazily
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "logger=rate,logger=rate" into a dict"""
+    rates = {}
+    for item in spec.split(","):
+        name, sep, rate = item.strip().partition("=")
+        if sep and name:
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class LogPipeline:
+    def __init__(self):
+        self.queue_handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def configure(self):
+        """Route all logging through a bounded queue drained by a background thread"""
+        if self.listener is not None:
+            return
+
+        level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+        log_format = os.environ.get('LOG_FORMAT', 'json')
+        queue_size = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+        sample_rates = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', 'server.status=0.01'))
+
+        if log_format == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(TEXT_FORMAT)
+
+        sink = logging.StreamHandler(sys.stdout)
+        sink.setFormatter(formatter)
+        sinks = [sink]
+        log_file = os.environ.get('LOG_FILE')
+        if log_file:
+            file_sink = logging.FileHandler(log_file, encoding="utf-8")
+            file_sink.setFormatter(formatter)
+            sinks.append(file_sink)
+
+        self.queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        # Filters run on the calling thread: the request id must be captured there,
+        # and sampled-out records never reach the queue
+        self.queue_handler.addFilter(SamplingFilter(sample_rates))
+        self.queue_handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.queue_handler)
+        root.setLevel(level)
+        self.adopt_server_loggers()
+
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, *sinks, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.shutdown)
+
+    def adopt_server_loggers(self):
+        """Send uvicorn's loggers, access log included, through the queue instead of their own handlers
+
+        uvicorn applies its logging config before importing the app, so this runs after it.
+        Embedding uvicorn.run() with an already imported app needs log_config=None instead.
+        """
+        for name in SERVER_LOGGERS:
+            server_logger = logging.getLogger(name)
+            for handler in list(server_logger.handlers):
+                server_logger.removeHandler(handler)
+            server_logger.propagate = True
+
+    def shutdown(self):
+        """Drain the queue and stop the listener thread"""
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+        if self.queue_handler.dropped:
+            sys.stderr.write(f"log pipeline dropped {self.queue_handler.dropped} records\n")
+
+    def stats(self) -> dict:
+        if self.queue_handler is None:
+            return {"queue_depth": 0, "queue_size": 0, "dropped": 0}
+        return {
+            "queue_depth": self.queue_handler.queue.qsize(),
+            "queue_size": self.queue_handler.queue.maxsize,
+            "dropped": self.queue_handler.dropped,
+        }
+
+
+# Create a singleton instance
+log_pipeline = LogPipeline()
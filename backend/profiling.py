@@ -0,0 +1,204 @@
+import os
+import hmac
+import json
+import time
+import random
+import asyncio
+import cProfile
+import hashlib
+import logging
+import pstats
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers
+
+logger = logging.getLogger(__name__)
+
+try:
+    # Optional: statistical, async-aware and much cheaper than cProfile's per-call hooks
+    from pyinstrument import Profiler as _StatisticalProfiler
+except ImportError:
+    _StatisticalProfiler = None
+
+PROFILE_HEADER = "X-Profile-Request"
+# Long-lived SSE connections would keep the profiler running (and every other profile
+# blocked) for hours, with an ever-growing sample buffer
+UNPROFILED_PATHS = {"/api/contact/stream"}
+
+
+def sign_profile_token(key: str, ttl_seconds: int = 300) -> str:
+    """Header value that forces profiling of a request until it expires"""
+    expires = str(int(time.time()) + ttl_seconds)
+    signature = hmac.new(key.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def _frame_name(function: str, file_path: str, line: int) -> str:
+    # Collapsed format uses ";" between frames and a space before the count
+    return f"{function} ({Path(file_path).name}:{line})".replace(";", ":").replace(" ", "_")
+
+
+def _collapse_pyinstrument(session) -> Counter:
+    stacks = Counter()
+    root = session.root_frame()
+    if root is None:
+        return stacks
+
+    def walk(frame, path):
+        path = path + [_frame_name(frame.function, frame.file_path_short or "", frame.line_no or 0)]
+        if frame.self_time > 0:
+            stacks[";".join(path)] += int(frame.self_time * 1e6)
+        for child in frame.children:
+            walk(child, path)
+
+    walk(root, [])
+    return stacks
+
+
+def _collapse_cprofile(profile: cProfile.Profile) -> Counter:
+    # cProfile only records caller/callee pairs, so stacks are two frames deep
+    stacks = Counter()
+    stats = pstats.Stats(profile).stats
+    for (file_path, line, function), (_, _, total_time, _, callers) in stats.items():
+        name = _frame_name(function, file_path, line)
+        if not callers:
+            stacks[name] += int(total_time * 1e6)
+            continue
+        for (caller_file, caller_line, caller_function), caller_stats in callers.items():
+            self_time = caller_stats[2]
+            if self_time > 0:
+                stacks[f"{_frame_name(caller_function, caller_file, caller_line)};{name}"] += int(self_time * 1e6)
+    return stacks
+
+
+class ProfileStore:
+    """Bounded on-disk ring of collapsed-stack profiles"""
+
+    def __init__(self, directory: str, ring_size: int):
+        self.directory = Path(directory)
+        self.ring_size = ring_size
+        self._seq = None
+        self._lock = threading.Lock()
+
+    def _next_seq(self) -> int:
+        if self._seq is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            existing = [int(p.name.split("_", 1)[0]) for p in self.directory.glob("*.json") if p.name[:8].isdigit()]
+            self._seq = max(existing, default=0)
+        self._seq += 1
+        return self._seq
+
+    def write(self, record: dict):
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", record["route"]).strip("-") or "root"
+        with self._lock:
+            path = self.directory / f"{self._next_seq():08d}_{slug}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(record), encoding="utf-8")
+            tmp.replace(path)
+            files = sorted(self.directory.glob("*.json"))
+            for old in files[:-self.ring_size]:
+                old.unlink(missing_ok=True)
+
+    def read(self, route: Optional[str] = None, limit: int = 100) -> list:
+        if not self.directory.exists():
+            return []
+        records = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if route is None or record["route"] == route:
+                records.append(record)
+                if len(records) >= limit:
+                    break
+        return records
+
+    def aggregate(self, route: Optional[str] = None, limit: int = 100) -> str:
+        """Merge recent profiles into flamegraph.pl / speedscope collapsed lines, rooted per route"""
+        totals = Counter()
+        for record in self.read(route, limit):
+            root = f"{record['method']}_{record['route']}".replace(";", ":").replace(" ", "_")
+            for stack, weight in record["stacks"].items():
+                totals[f"{root};{stack}"] += weight
+        return "\n".join(f"{stack} {weight}" for stack, weight in sorted(totals.items())) + "\n"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles a sampled or explicitly signed subset of requests"""
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+        self.sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+        self.signing_key = os.environ.get('PROFILE_SIGNING_KEY', '')
+        self.store = profile_store
+        # Both profilers hook the interpreter globally, so only one request is profiled at a time
+        self._active = False
+
+    def _requested(self, scope) -> bool:
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return True
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        if not token or not self.signing_key:
+            return False
+        expires, _, signature = token.partition(".")
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        expected = hmac.new(self.signing_key.encode(), expires.encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(signature, expected)
+
+    async def __call__(self, scope, receive, send):
+        if (not self.enabled or scope["type"] != "http" or scope["path"] in UNPROFILED_PATHS
+                or self._active or not self._requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        start = time.perf_counter()
+        if _StatisticalProfiler is not None:
+            kind = "pyinstrument"
+            profiler = _StatisticalProfiler(interval=0.001, async_mode="enabled")
+            profiler.start()
+        else:
+            # Deterministic fallback; also sees other requests interleaved on the loop
+            kind = "cprofile"
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if kind == "pyinstrument":
+                session = profiler.stop()
+            else:
+                profiler.disable()
+            self._active = False
+            duration_ms = round((time.perf_counter() - start) * 1000, 3)
+
+            route = scope.get("route")
+            try:
+                if kind == "pyinstrument":
+                    stacks = await asyncio.to_thread(_collapse_pyinstrument, session)
+                else:
+                    stacks = await asyncio.to_thread(_collapse_cprofile, profiler)
+                await asyncio.to_thread(self.store.write, {
+                    "route": getattr(route, "path", scope["path"]),
+                    "method": scope["method"],
+                    "duration_ms": duration_ms,
+                    "profiler": kind,
+                    "captured_at": time.time(),
+                    "stacks": dict(stacks),
+                })
+            except Exception as e:
+                logger.error("Failed to store profile: %s", e)
+
+
+# Create a singleton instance
+profile_store = ProfileStore(
+    os.environ.get('PROFILE_DIR', '/tmp/techyhive-profiles'),
+    int(os.environ.get('PROFILE_RING_SIZE', '200')),
+)
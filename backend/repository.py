@@ -0,0 +1,483 @@
+import os
+import json
+import asyncio
+import sqlite3
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+from retention import CONTACT_SUBMISSIONS, CONTACT_ARCHIVE
+from email_events import event_order, statuses_up_to
+
+CONTACT_QUARANTINE = "contact_quarantine"
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    # Same ISO format as the timestamps, so string order is time order
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _cursor_key(doc: dict) -> tuple:
+    return doc.get("updated_at", ""), doc["id"]
+
+
+def _released(doc: dict) -> dict:
+    """A quarantined document moved into the main store; its spam_reasons stay for the record"""
+    return {**doc, "spam_flagged": False, "updated_at": _now()}
+
+
+class SubmissionRepository(ABC):
+    """Storage for contact submissions; documents are plain dicts with ISO string timestamps"""
+
+    name = "base"
+
+    async def setup(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def insert(self, doc: dict):
+        ...
+
+    @abstractmethod
+    async def insert_many(self, docs: List[dict]):
+        ...
+
+    @abstractmethod
+    async def get(self, submission_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list(self, limit: int = 1000, offset: int = 0, include_archived: bool = False) -> List[dict]:
+        """Newest-first page of submissions"""
+
+    @abstractmethod
+    async def changed_since(self, since: str, after_id: str = "", limit: int = 1000,
+                            include_archived: bool = False) -> List[dict]:
+        """Submissions after the (updated_at, id) cursor, ordered by that pair
+
+        Many rows can share one updated_at (a webhook batch stamps them all at once), so the id
+        breaks ties and a page cut inside them resumes where it stopped. after_id="" takes
+        every row at `since`.
+        """
+
+    @abstractmethod
+    async def update_status(self, submission_id: str, status: str) -> Optional[dict]:
+        """Set the status and return the updated document, or None if it does not exist"""
+
+    @abstractmethod
+    async def insert_quarantined(self, doc: dict, reasons: List[str]):
+        """Store a submission flagged by the spam filter, outside the main collection"""
+
+    @abstractmethod
+    async def list_quarantined(self, limit: int = 100, offset: int = 0) -> List[dict]:
+        """Newest-first page of quarantined submissions, each with its spam_reasons"""
+
+    @abstractmethod
+    async def release_quarantined(self, submission_id: str) -> Optional[dict]:
+        """Move a quarantined submission into the main store; returns it, or None if it is not quarantined"""
+
+    @abstractmethod
+    async def record_email_message(self, submission_id: str, kind: str, message_id: str):
+        """Remember the provider message id of an email sent for a submission"""
+
+    @abstractmethod
+    async def apply_email_events(self, updates: Dict[str, dict]):
+        """Apply {message_id: {"status", "event_at"}} in one batch, ignoring out-of-order events
+
+        An event replaces the stored status when it is newer, or from the same second
+        and not earlier in the delivery lifecycle.
+        """
+
+
+class MongoSubmissionRepository(SubmissionRepository):
+    """Motor-backed storage with the hot collection and the archive tier"""
+
+    name = "mongo"
+
+    def __init__(self, db):
+        self.db = db
+
+    async def insert(self, doc: dict):
+        # insert_one adds _id to the dict it is given
+        await self.db[CONTACT_SUBMISSIONS].insert_one(dict(doc))
+
+    async def insert_many(self, docs: List[dict]):
+        if docs:
+            await self.db[CONTACT_SUBMISSIONS].insert_many([dict(doc) for doc in docs], ordered=False)
+
+    async def get(self, submission_id: str) -> Optional[dict]:
+        # Transparently falls back to the archive tier
+        submission = await self.db[CONTACT_SUBMISSIONS].find_one({"id": submission_id}, {"_id": 0})
+        if submission is None:
+            submission = await self.db[CONTACT_ARCHIVE].find_one({"id": submission_id}, {"_id": 0, "archived_at": 0})
+        return submission
+
+    async def list(self, limit: int = 1000, offset: int = 0, include_archived: bool = False) -> List[dict]:
+        if not include_archived:
+            cursor = self.db[CONTACT_SUBMISSIONS].find({}, {"_id": 0}).sort("timestamp", -1).skip(offset)
+            return await cursor.to_list(limit)
+
+        # Pending/contacted submissions can be older than archived ones, so merge by timestamp
+        window = offset + limit
+        hot = await self.db[CONTACT_SUBMISSIONS].find({}, {"_id": 0}).sort("timestamp", -1).to_list(window)
+        archived = await self.db[CONTACT_ARCHIVE].find({}, {"_id": 0, "archived_at": 0}).sort("timestamp", -1).to_list(window)
+        merged = sorted(hot + archived, key=lambda s: s["timestamp"], reverse=True)
+        return merged[offset:window]
+
+    async def changed_since(self, since: str, after_id: str = "", limit: int = 1000,
+                            include_archived: bool = False) -> List[dict]:
+        query = {"$or": [{"updated_at": {"$gt": since}}, {"updated_at": since, "id": {"$gt": after_id}}]}
+        order = [("updated_at", 1), ("id", 1)]
+        changed = await self.db[CONTACT_SUBMISSIONS].find(query, {"_id": 0}).sort(order).to_list(limit)
+        if include_archived:
+            archived = await self.db[CONTACT_ARCHIVE].find(query, {"_id": 0, "archived_at": 0}).sort(order).to_list(limit)
+            changed = sorted(changed + archived, key=_cursor_key)[:limit]
+        return changed
+
+    async def update_status(self, submission_id: str, status: str) -> Optional[dict]:
+        return await self.db[CONTACT_SUBMISSIONS].find_one_and_update(
+            {"id": submission_id},
+            {"$set": {"status": status, "updated_at": _now()}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def insert_quarantined(self, doc: dict, reasons: List[str]):
+        await self.db[CONTACT_QUARANTINE].insert_one({**doc, "spam_reasons": reasons})
+
+    async def list_quarantined(self, limit: int = 100, offset: int = 0) -> List[dict]:
+        cursor = self.db[CONTACT_QUARANTINE].find({}, {"_id": 0}).sort("timestamp", -1).skip(offset)
+        return await cursor.to_list(limit)
+
+    async def release_quarantined(self, submission_id: str) -> Optional[dict]:
+        # Claimed by the delete, so two concurrent releases cannot both insert it
+        doc = await self.db[CONTACT_QUARANTINE].find_one_and_delete({"id": submission_id}, projection={"_id": 0})
+        if doc is None:
+            return None
+        doc = _released(doc)
+        await self.insert(doc)
+        return doc
+
+    async def record_email_message(self, submission_id: str, kind: str, message_id: str):
+        await self.db[CONTACT_SUBMISSIONS].update_one(
+            {"id": submission_id},
+            {
+                "$push": {"email_messages": {"message_id": message_id, "kind": kind, "status": "sent", "event_at": 0}},
+                "$set": {"updated_at": _now()},
+            },
+        )
+
+    async def apply_email_events(self, updates: Dict[str, dict]):
+        updated_at = _now()
+        ops = [
+            UpdateOne(
+                {"email_messages": {"$elemMatch": {"message_id": message_id, "$or": [
+                    {"event_at": {"$lt": update["event_at"]}},
+                    {"event_at": update["event_at"], "status": {"$in": statuses_up_to(update["status"])}},
+                ]}}},
+                {"$set": {
+                    "email_messages.$.status": update["status"],
+                    "email_messages.$.event_at": update["event_at"],
+                    "updated_at": updated_at,
+                }},
+            )
+            for message_id, update in updates.items()
+        ]
+        if ops:
+            await self.db[CONTACT_SUBMISSIONS].bulk_write(ops, ordered=False)
+
+
+class SQLiteSubmissionRepository(SubmissionRepository):
+    """Embedded single-node storage: one WAL-mode connection driven from a dedicated thread"""
+
+    name = "sqlite"
+
+    # Fixed statement strings so sqlite3's per-connection statement cache reuses the compiled plans
+    INSERT_SQL = "INSERT INTO contact_submissions (id, timestamp, status, doc) VALUES (?, ?, ?, ?)"
+    QUARANTINE_SQL = "INSERT INTO contact_quarantine (id, timestamp, reasons, doc) VALUES (?, ?, ?, ?)"
+    LIST_QUARANTINE_SQL = "SELECT reasons, doc FROM contact_quarantine ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+    RELEASE_SQL = "DELETE FROM contact_quarantine WHERE id = ? RETURNING reasons, doc"
+    RECORD_MESSAGE_SQL = (
+        "INSERT OR REPLACE INTO email_messages (message_id, submission_id, kind, status, event_at) "
+        "VALUES (?, ?, ?, 'sent', 0)"
+    )
+    APPLY_EVENT_SQL = (
+        "UPDATE email_messages SET status = ?, event_at = ? WHERE message_id = ? "
+        "AND (event_at < ? OR (event_at = ? AND status IN (SELECT value FROM json_each(?))))"
+    )
+    TOUCH_SQL = "UPDATE contact_submissions SET doc = json_set(doc, '$.updated_at', ?) WHERE id = ?"
+    TOUCH_BY_MESSAGE_SQL = (
+        "UPDATE contact_submissions SET doc = json_set(doc, '$.updated_at', ?) "
+        "WHERE id = (SELECT submission_id FROM email_messages WHERE message_id = ?)"
+    )
+    # One lookup per page: the ids go in as a single JSON array, so the statement text stays fixed
+    MESSAGES_SQL = (
+        "SELECT submission_id, message_id, kind, status, event_at FROM email_messages "
+        "WHERE submission_id IN (SELECT value FROM json_each(?)) ORDER BY rowid"
+    )
+    GET_SQL = "SELECT doc FROM contact_submissions WHERE id = ?"
+    LIST_SQL = "SELECT doc FROM contact_submissions ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+    # Same expression as the index, so the planner uses it
+    CHANGED_SQL = (
+        "SELECT doc FROM contact_submissions WHERE json_extract(doc, '$.updated_at') > ? "
+        "OR (json_extract(doc, '$.updated_at') = ? AND id > ?) "
+        "ORDER BY json_extract(doc, '$.updated_at'), id LIMIT ?"
+    )
+    UPDATE_STATUS_SQL = (
+        "UPDATE contact_submissions SET status = ?, doc = json_set(doc, '$.status', ?, '$.updated_at', ?) "
+        "WHERE id = ? RETURNING doc"
+    )
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS contact_submissions ("
+        " id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, status TEXT NOT NULL, doc TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_contact_submissions_timestamp ON contact_submissions (timestamp DESC)",
+        "DROP INDEX IF EXISTS idx_contact_submissions_updated_at",
+        "CREATE INDEX IF NOT EXISTS idx_contact_submissions_updated_at_id"
+        " ON contact_submissions (json_extract(doc, '$.updated_at'), id)",
+        "CREATE TABLE IF NOT EXISTS contact_quarantine ("
+        " id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, reasons TEXT NOT NULL, doc TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS email_messages ("
+        " message_id TEXT PRIMARY KEY, submission_id TEXT NOT NULL, kind TEXT NOT NULL,"
+        " status TEXT NOT NULL, event_at INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_email_messages_submission ON email_messages (submission_id)",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        # A single worker serializes access to the connection and keeps disk I/O off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = None
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        self._conn = conn
+
+    async def setup(self):
+        if self._conn is None:
+            await self._run(self._connect)
+            logger.info("SQLite storage ready at %s", self.path)
+
+    async def close(self):
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _row(doc: dict) -> tuple:
+        return (doc["id"], doc["timestamp"], doc["status"], json.dumps(doc))
+
+    def _insert_many_sync(self, rows: List[tuple]):
+        with self._conn:
+            self._conn.executemany(self.INSERT_SQL, rows)
+
+    async def insert(self, doc: dict):
+        await self._run(self._insert_many_sync, [self._row(doc)])
+
+    async def insert_many(self, docs: List[dict]):
+        if docs:
+            await self._run(self._insert_many_sync, [self._row(doc) for doc in docs])
+
+    def _with_messages(self, rows: List[tuple]) -> List[dict]:
+        """Decode doc rows and attach their email messages"""
+        docs = [json.loads(row[0]) for row in rows]
+        if not docs:
+            return docs
+        by_id = {doc["id"]: doc for doc in docs}
+        ids = json.dumps(list(by_id))
+        for submission_id, message_id, kind, status, event_at in self._conn.execute(self.MESSAGES_SQL, (ids,)):
+            by_id[submission_id].setdefault("email_messages", []).append(
+                {"message_id": message_id, "kind": kind, "status": status, "event_at": event_at}
+            )
+        return docs
+
+    def _get_sync(self, submission_id: str) -> Optional[dict]:
+        row = self._conn.execute(self.GET_SQL, (submission_id,)).fetchone()
+        return self._with_messages([row])[0] if row else None
+
+    async def get(self, submission_id: str) -> Optional[dict]:
+        return await self._run(self._get_sync, submission_id)
+
+    def _list_sync(self, limit: int, offset: int) -> List[dict]:
+        return self._with_messages(self._conn.execute(self.LIST_SQL, (limit, offset)).fetchall())
+
+    async def list(self, limit: int = 1000, offset: int = 0, include_archived: bool = False) -> List[dict]:
+        # No archive tier on the embedded engine
+        return await self._run(self._list_sync, limit, offset)
+
+    def _changed_since_sync(self, since: str, after_id: str, limit: int) -> List[dict]:
+        rows = self._conn.execute(self.CHANGED_SQL, (since, since, after_id, limit)).fetchall()
+        return self._with_messages(rows)
+
+    async def changed_since(self, since: str, after_id: str = "", limit: int = 1000,
+                            include_archived: bool = False) -> List[dict]:
+        return await self._run(self._changed_since_sync, since, after_id, limit)
+
+    def _update_status_sync(self, submission_id: str, status: str, updated_at: str) -> Optional[dict]:
+        with self._conn:
+            row = self._conn.execute(self.UPDATE_STATUS_SQL, (status, status, updated_at, submission_id)).fetchone()
+        return self._with_messages([row])[0] if row else None
+
+    async def update_status(self, submission_id: str, status: str) -> Optional[dict]:
+        return await self._run(self._update_status_sync, submission_id, status, _now())
+
+    def _insert_quarantined_sync(self, row: tuple):
+        with self._conn:
+            self._conn.execute(self.QUARANTINE_SQL, row)
+
+    async def insert_quarantined(self, doc: dict, reasons: List[str]):
+        row = (doc["id"], doc["timestamp"], ",".join(reasons), json.dumps(doc))
+        await self._run(self._insert_quarantined_sync, row)
+
+    def _list_quarantined_sync(self, limit: int, offset: int) -> List[dict]:
+        rows = self._conn.execute(self.LIST_QUARANTINE_SQL, (limit, offset)).fetchall()
+        return [{**json.loads(doc), "spam_reasons": reasons.split(",")} for reasons, doc in rows]
+
+    async def list_quarantined(self, limit: int = 100, offset: int = 0) -> List[dict]:
+        return await self._run(self._list_quarantined_sync, limit, offset)
+
+    def _release_quarantined_sync(self, submission_id: str) -> Optional[dict]:
+        with self._conn:
+            row = self._conn.execute(self.RELEASE_SQL, (submission_id,)).fetchone()
+            if row is None:
+                return None
+            doc = _released({**json.loads(row[1]), "spam_reasons": row[0].split(",")})
+            self._conn.execute(self.INSERT_SQL, self._row(doc))
+        return doc
+
+    async def release_quarantined(self, submission_id: str) -> Optional[dict]:
+        return await self._run(self._release_quarantined_sync, submission_id)
+
+    def _record_email_message_sync(self, row: tuple, updated_at: str):
+        with self._conn:
+            self._conn.execute(self.RECORD_MESSAGE_SQL, row)
+            self._conn.execute(self.TOUCH_SQL, (updated_at, row[1]))
+
+    async def record_email_message(self, submission_id: str, kind: str, message_id: str):
+        await self._run(self._record_email_message_sync, (message_id, submission_id, kind), _now())
+
+    def _apply_email_events_sync(self, rows: List[tuple]):
+        updated_at = _now()
+        with self._conn:
+            for row in rows:
+                # Stale (out-of-order) events change nothing, so they must not move updated_at either
+                if self._conn.execute(self.APPLY_EVENT_SQL, row).rowcount:
+                    self._conn.execute(self.TOUCH_BY_MESSAGE_SQL, (updated_at, row[2]))
+
+    async def apply_email_events(self, updates: Dict[str, dict]):
+        rows = [
+            (update["status"], update["event_at"], message_id, update["event_at"], update["event_at"],
+             json.dumps(statuses_up_to(update["status"])))
+            for message_id, update in updates.items()
+        ]
+        if rows:
+            await self._run(self._apply_email_events_sync, rows)
+
+
+class InMemorySubmissionRepository(SubmissionRepository):
+    """Process-local storage for tests and throwaway instances"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.submissions = {}
+        self.quarantine = {}
+        self._message_owners = {}
+
+    async def insert(self, doc: dict):
+        self.submissions[doc["id"]] = dict(doc)
+
+    async def insert_many(self, docs: List[dict]):
+        for doc in docs:
+            self.submissions[doc["id"]] = dict(doc)
+
+    async def get(self, submission_id: str) -> Optional[dict]:
+        doc = self.submissions.get(submission_id)
+        return dict(doc) if doc is not None else None
+
+    async def list(self, limit: int = 1000, offset: int = 0, include_archived: bool = False) -> List[dict]:
+        docs = sorted(self.submissions.values(), key=lambda s: s["timestamp"], reverse=True)
+        return [dict(doc) for doc in docs[offset:offset + limit]]
+
+    async def changed_since(self, since: str, after_id: str = "", limit: int = 1000,
+                            include_archived: bool = False) -> List[dict]:
+        docs = sorted(
+            (doc for doc in self.submissions.values() if _cursor_key(doc) > (since, after_id)),
+            key=_cursor_key,
+        )
+        return [dict(doc) for doc in docs[:limit]]
+
+    async def update_status(self, submission_id: str, status: str) -> Optional[dict]:
+        doc = self.submissions.get(submission_id)
+        if doc is None:
+            return None
+        doc["status"] = status
+        doc["updated_at"] = _now()
+        return dict(doc)
+
+    async def insert_quarantined(self, doc: dict, reasons: List[str]):
+        self.quarantine[doc["id"]] = {**doc, "spam_reasons": reasons}
+
+    async def list_quarantined(self, limit: int = 100, offset: int = 0) -> List[dict]:
+        docs = sorted(self.quarantine.values(), key=lambda s: s["timestamp"], reverse=True)
+        return [dict(doc) for doc in docs[offset:offset + limit]]
+
+    async def release_quarantined(self, submission_id: str) -> Optional[dict]:
+        doc = self.quarantine.pop(submission_id, None)
+        if doc is None:
+            return None
+        doc = _released(doc)
+        self.submissions[doc["id"]] = dict(doc)
+        return dict(doc)
+
+    async def record_email_message(self, submission_id: str, kind: str, message_id: str):
+        doc = self.submissions.get(submission_id)
+        if doc is None:
+            return
+        message = {"message_id": message_id, "kind": kind, "status": "sent", "event_at": 0}
+        doc["email_messages"] = doc.get("email_messages", []) + [message]
+        doc["updated_at"] = _now()
+        self._message_owners[message_id] = submission_id
+
+    async def apply_email_events(self, updates: Dict[str, dict]):
+        updated_at = _now()
+        for message_id, update in updates.items():
+            doc = self.submissions.get(self._message_owners.get(message_id))
+            if doc is None:
+                continue
+            for message in doc["email_messages"]:
+                if message["message_id"] == message_id and event_order(message) <= event_order(update):
+                    message.update(update)
+                    doc["updated_at"] = updated_at
+
+
+def create_repository(db) -> Optional[SubmissionRepository]:
+    """Pick the storage engine from STORAGE_BACKEND (mongo, sqlite or memory)"""
+    backend = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+    if backend == "sqlite":
+        path = os.environ.get('SQLITE_PATH', str(Path(__file__).parent / 'techyhive.db'))
+        return SQLiteSubmissionRepository(path)
+    if backend == "memory":
+        return InMemorySubmissionRepository()
+    if backend != "mongo":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    return MongoSubmissionRepository(db) if db is not None else None
@@ -0,0 +1,82 @@
+import os
+import json
+import logging
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+
+logger = logging.getLogger(__name__)
+
+BODY_METHODS = ("POST", "PUT", "PATCH")
+
+
+async def _payload_too_large(send, limit: int):
+    body = json.dumps({"detail": f"Request body exceeds {limit} bytes"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware that rejects oversized request bodies before they are fully read"""
+
+    def __init__(self, app):
+        self.app = app
+        self.max_body_bytes = int(os.environ.get('MAX_REQUEST_BODY_BYTES', str(64 * 1024)))
+        # SendGrid posts event batches that are far larger than any form submission
+        self.path_limits = {
+            "/api/email/events": int(os.environ.get('MAX_EMAIL_EVENTS_BODY_BYTES', str(5 * 1024 * 1024))),
+        }
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in BODY_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope["path"], self.max_body_bytes)
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None:
+            if not content_length.isdigit() or int(content_length) > limit:
+                # Declared too large: answer without reading a single body chunk
+                self.rejected += 1
+                await _payload_too_large(send, limit)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Chunked bodies have no Content-Length; stop at the first chunk past the limit.
+                    # FastAPI re-raises HTTPException from body parsing, so this becomes a 413
+                    raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+            return message
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_wrapper)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            self.rejected += 1
+            await _payload_too_large(send, limit)
+        else:
+            if received > limit:
+                self.rejected += 1
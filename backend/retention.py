@@ -0,0 +1,203 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHECKS = "status_checks"
+STATUS_ROLLUPS = "status_check_rollups"
+CONTACT_SUBMISSIONS = "contact_submissions"
+CONTACT_ARCHIVE = "contact_submissions_archive"
+
+ROLLUP_GRANULARITIES = ("minute", "hour")
+
+
+def _created_at(timestamp) -> datetime:
+    """TTL date for a status check stored before created_at existed; unreadable ones expire a TTL from now"""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            timestamp = None
+    if not isinstance(timestamp, datetime):
+        return datetime.now(timezone.utc)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def _bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+class RetentionService:
+    def __init__(self):
+        # Status checks are either capped (fixed size ring) or expired by TTL
+        self.status_capped_bytes = int(os.environ.get('STATUS_CHECK_CAPPED_BYTES', '0'))
+        self.status_capped_max = int(os.environ.get('STATUS_CHECK_CAPPED_MAX', '0'))
+        self.status_ttl_seconds = int(os.environ.get('STATUS_CHECK_TTL_SECONDS', str(7 * 24 * 3600)))
+        self.minute_rollup_ttl_seconds = int(os.environ.get('STATUS_ROLLUP_MINUTE_TTL_SECONDS', str(30 * 24 * 3600)))
+        # Completed contact submissions older than this move to the archive collection
+        self.archive_after_days = int(os.environ.get('CONTACT_ARCHIVE_AFTER_DAYS', '90'))
+        self.archive_interval_seconds = int(os.environ.get('CONTACT_ARCHIVE_INTERVAL_SECONDS', '3600'))
+        self.archive_batch_size = int(os.environ.get('CONTACT_ARCHIVE_BATCH_SIZE', '500'))
+        self.backfill_batch_size = int(os.environ.get('STATUS_CHECK_BACKFILL_BATCH_SIZE', '1000'))
+
+    async def ensure_collections(self, db):
+        """Create the capped/TTL status collection, rollups and tier indexes"""
+        await self._ensure_status_checks(db)
+
+        await db[STATUS_ROLLUPS].create_index(
+            [("granularity", 1), ("client_name", 1), ("bucket_start", 1)],
+            unique=True,
+            name="rollup_bucket",
+        )
+        await db[STATUS_ROLLUPS].create_index(
+            [("granularity", 1), ("bucket_start", -1)],
+            name="rollup_recent",
+        )
+        await self._ensure_ttl_index(db, STATUS_ROLLUPS, "expires_at", 0, "rollup_ttl")
+
+        await db[CONTACT_SUBMISSIONS].create_index([("timestamp", -1)], name="timestamp_desc")
+        await db[CONTACT_SUBMISSIONS].create_index([("status", 1), ("timestamp", 1)], name="status_timestamp")
+        await db[CONTACT_SUBMISSIONS].create_index("id", name="submission_id")
+        # Backs the ?since= delta query, which pages by (updated_at, id); documents written
+        # before updated_at existed are left out
+        await db[CONTACT_SUBMISSIONS].create_index([("updated_at", 1), ("id", 1)], name="updated_at_id")
+        await db[CONTACT_SUBMISSIONS].create_index("email_messages.message_id", sparse=True, name="email_message_id")
+        await db[CONTACT_ARCHIVE].create_index("id", unique=True, name="submission_id")
+        await db[CONTACT_ARCHIVE].create_index([("timestamp", -1)], name="timestamp_desc")
+        await db[CONTACT_ARCHIVE].create_index([("updated_at", 1), ("id", 1)], name="updated_at_id")
+
+    async def _ensure_status_checks(self, db):
+        if self.status_capped_bytes > 0:
+            names = await db.list_collection_names()
+            if STATUS_CHECKS not in names:
+                options = {"capped": True, "size": self.status_capped_bytes}
+                if self.status_capped_max > 0:
+                    options["max"] = self.status_capped_max
+                await db.create_collection(STATUS_CHECKS, **options)
+                logger.info("Created capped %s collection (%d bytes)", STATUS_CHECKS, self.status_capped_bytes)
+            else:
+                current = await db[STATUS_CHECKS].options()
+                if not current.get("capped"):
+                    await db.command("convertToCapped", STATUS_CHECKS, size=self.status_capped_bytes)
+                    logger.info("Converted %s to a capped collection", STATUS_CHECKS)
+        elif self.status_ttl_seconds > 0:
+            await self._ensure_ttl_index(db, STATUS_CHECKS, "created_at", self.status_ttl_seconds, "status_checks_ttl")
+            await self.backfill_status_created_at(db)
+
+        await db[STATUS_CHECKS].create_index([("timestamp", -1)], name="timestamp_desc")
+
+    async def backfill_status_created_at(self, db) -> int:
+        """Stamp created_at on status checks written before it existed; the TTL index skips them otherwise"""
+        backfilled = 0
+        while True:
+            docs = await db[STATUS_CHECKS].find(
+                {"created_at": {"$exists": False}}, {"_id": 1, "timestamp": 1}
+            ).to_list(self.backfill_batch_size)
+            if not docs:
+                break
+            await db[STATUS_CHECKS].bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"created_at": _created_at(doc.get("timestamp"))}})
+                for doc in docs
+            ], ordered=False)
+            backfilled += len(docs)
+        if backfilled:
+            logger.info("Backfilled created_at on %d %s documents", backfilled, STATUS_CHECKS)
+        return backfilled
+
+    async def _ensure_ttl_index(self, db, collection: str, field: str, seconds: int, name: str):
+        try:
+            await db[collection].create_index(field, expireAfterSeconds=seconds, name=name)
+        except OperationFailure:
+            # The index exists with a different expiry, update it in place
+            await db.command("collMod", collection, index={"name": name, "expireAfterSeconds": seconds})
+            logger.info("Updated TTL on %s.%s to %ds", collection, field, seconds)
+
+    async def record_heartbeat(self, db, client_name: str, ts: datetime):
+        """Increment the per-minute and per-hour heartbeat counters for a client"""
+        ops = []
+        for granularity in ROLLUP_GRANULARITIES:
+            on_insert = {"first_seen": ts}
+            if granularity == "minute" and self.minute_rollup_ttl_seconds > 0:
+                on_insert["expires_at"] = _bucket_start(ts, granularity) + timedelta(seconds=self.minute_rollup_ttl_seconds)
+            ops.append(UpdateOne(
+                {
+                    "granularity": granularity,
+                    "client_name": client_name,
+                    "bucket_start": _bucket_start(ts, granularity),
+                },
+                {"$inc": {"count": 1}, "$max": {"last_seen": ts}, "$setOnInsert": on_insert},
+                upsert=True,
+            ))
+        await db[STATUS_ROLLUPS].bulk_write(ops, ordered=False)
+
+    async def get_rollups(self, db, granularity: str, client_name: Optional[str] = None,
+                          since: Optional[datetime] = None, limit: int = 500) -> List[dict]:
+        query = {"granularity": granularity}
+        if client_name:
+            query["client_name"] = client_name
+        if since is not None:
+            query["bucket_start"] = {"$gte": since}
+        projection = {"_id": 0, "client_name": 1, "granularity": 1, "bucket_start": 1, "count": 1, "last_seen": 1}
+        return await db[STATUS_ROLLUPS].find(query, projection).sort("bucket_start", -1).to_list(limit)
+
+    async def archive_completed_submissions(self, db, older_than_days: Optional[int] = None) -> int:
+        """Move completed submissions older than the cutoff into the archive tier"""
+        days = self.archive_after_days if older_than_days is None else older_than_days
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        query = {"status": "completed", "timestamp": {"$lt": cutoff}}
+
+        moved = 0
+        while True:
+            docs = await db[CONTACT_SUBMISSIONS].find(query, {"_id": 0}).limit(self.archive_batch_size).to_list(self.archive_batch_size)
+            if not docs:
+                break
+
+            archived_at = datetime.now(timezone.utc).isoformat()
+            # Upsert so a run interrupted between copy and delete can simply be repeated
+            await db[CONTACT_ARCHIVE].bulk_write(
+                [ReplaceOne({"id": doc["id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in docs],
+                ordered=False,
+            )
+            ids = [doc["id"] for doc in docs]
+            # Exactly the copied ids, and only while still completed: a submission reopened
+            # since the copy stays in the hot tier
+            await db[CONTACT_SUBMISSIONS].delete_many({"id": {"$in": ids}, "status": "completed"})
+            reopened = [doc["id"] for doc in await db[CONTACT_SUBMISSIONS].find({"id": {"$in": ids}}, {"_id": 0, "id": 1}).to_list(None)]
+            if reopened:
+                # Their archive copies are stale and would show up twice in merged reads
+                await db[CONTACT_ARCHIVE].delete_many({"id": {"$in": reopened}})
+                logger.info("Kept %d reopened contact submissions out of the archive", len(reopened))
+
+            moved += len(docs) - len(reopened)
+            if len(docs) < self.archive_batch_size:
+                break
+
+        if moved:
+            logger.info("Archived %d completed contact submissions older than %d days", moved, days)
+        return moved
+
+    async def run_archive_loop(self, db, on_archived=None):
+        """Periodically archive old completed submissions until cancelled"""
+        if self.archive_interval_seconds <= 0:
+            return
+        while True:
+            try:
+                if await self.archive_completed_submissions(db) and on_archived is not None:
+                    on_archived()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Contact archive job failed: %s", e)
+            await asyncio.sleep(self.archive_interval_seconds)
+
+
+# Create a singleton instance
+retention_service = RetentionService()
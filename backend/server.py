@@ -1,44 +1,63 @@
-from fastapi import FastAPI, APIRouter, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import hmac
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from typing import List, Optional, Literal
 import uuid
-from datetime import datetime, timezone
+import zlib
+from datetime import datetime, timezone, timedelta
 import asyncio
 
-# Configure logging FIRST
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
 ROOT_DIR = Path(__file__).parent
+# Load .env before the service modules below read their settings at import time
 load_dotenv(ROOT_DIR / '.env')
 
+import tracing
+from tracing import tracer, TracedRoute, TracingMiddleware
+from log_pipeline import log_pipeline
+
+# Configure logging FIRST: records are queued and written by a background thread
+log_pipeline.configure()
+logger = logging.getLogger(__name__)
+# Heartbeats are high-frequency; this logger is sampled via LOG_SAMPLE_RATES
+status_logger = logging.getLogger("server.status")
+
 from email_service import email_service
+from email_dispatch import email_dispatcher, EmailJob
+from retention import retention_service
+from submission_events import submission_broker
+from repository import create_repository, MongoSubmissionRepository
+from admission import admission_controller, AdmissionMiddleware
+from request_limits import BodySizeLimitMiddleware
+from profiling import ProfilingMiddleware, profile_store
+from spam_filter import spam_filter
+from email_events import email_event_ingestor, parse_events, SIGNATURE_HEADER, TIMESTAMP_HEADER
 
 # MongoDB connection with error handling
 try:
     mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
     client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=500)  # Reduced to 500ms
     db = client[os.environ.get('DB_NAME', 'techyhive')]
-    logger.info(f"MongoDB connection configured for: {mongo_url}")
+    logger.info("MongoDB connection configured for: %s", mongo_url)
 except Exception as e:
-    logger.error(f"MongoDB connection error: {e}")
+    logger.error("MongoDB connection error: %s", e)
     client = None
     db = None
 
+# Contact submissions go through a storage repository chosen by STORAGE_BACKEND
+repository = create_repository(db)
+
 # Create the main app without a prefix
 app = FastAPI()
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=TracedRoute)
 
 
 # Define Models
@@ -52,6 +71,21 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusCheckRollup(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    client_name: str
+    granularity: str
+    bucket_start: datetime
+    count: int
+    last_seen: Optional[datetime] = None
+
+class EmailMessageStatus(BaseModel):
+    message_id: str
+    kind: str
+    status: str = "sent"
+    event_at: int = 0  # unix time of the latest SendGrid event applied
+
 class ContactSubmission(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -66,16 +100,36 @@ class ContactSubmission(BaseModel):
     description: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     status: str = "pending"  # pending, contacted, completed
+    updated_at: Optional[datetime] = None  # drives ?since= deltas; unset on older documents
+    email_messages: List[EmailMessageStatus] = []
+    # Set when content signals agreed the submission may be spam; it is stored and the admin notified
+    spam_flagged: bool = False
+    spam_reasons: List[str] = []
 
 class ContactSubmissionCreate(BaseModel):
-    name: str
-    email: str
-    phone: str = ""
-    project_type: str
-    domain: str = ""
-    deadline: str = ""
-    budget: str = ""
-    description: str
+    # Bounds mirror the frontend form; anything outside them fails validation
+    # before the handler runs, so nothing is stored or rendered into email
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
+    name: str = Field(min_length=1, max_length=100)
+    email: EmailStr
+    phone: str = Field("", max_length=32, pattern=r"^[0-9+()\-.\s]*$")
+    project_type: str = Field(min_length=1, max_length=100)
+    domain: str = Field("", max_length=100)
+    deadline: str = Field("", max_length=100)
+    budget: str = Field("", max_length=100)
+    description: str = Field(min_length=10, max_length=5000)
+    # Spam screening only; never stored. `website` is a honeypot real users leave empty
+    website: str = Field("", max_length=200)
+    form_token: str = Field("", max_length=200)
+
+SPAM_SCREEN_FIELDS = {"website", "form_token"}
+
+class ContactStatusUpdate(BaseModel):
+    status: Literal["pending", "contacted", "completed"]
+
+class FormToken(BaseModel):
+    token: Optional[str] = None
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -94,6 +148,38 @@ async def debug_env():
         "smtp_from_name": os.environ.get('SMTP_FROM_NAME', 'NOT_SET'),
     }
 
+@api_router.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(
+    route: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    x_debug_token: Optional[str] = Header(None),
+):
+    """Recent request profiles merged into flamegraph-ready collapsed stacks"""
+    debug_token = os.environ.get('DEBUG_TOKEN')
+    if not debug_token or not x_debug_token or not hmac.compare_digest(x_debug_token, debug_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return await asyncio.to_thread(profile_store.aggregate, route, limit)
+
+@api_router.get("/debug/admission")
+async def debug_admission():
+    """Queue depth, in-flight counts and shed/rejected totals of the admission controller"""
+    return admission_controller.stats()
+
+@api_router.get("/debug/email-events")
+async def debug_email_events():
+    """Received/applied totals and queued batches of the SendGrid event ingestor"""
+    return email_event_ingestor.stats()
+
+@api_router.get("/debug/email-dispatch")
+async def debug_email_dispatch():
+    """Queue depth, send totals and cumulative per-stage time of the email pipeline"""
+    return email_dispatcher.stats()
+
+@api_router.get("/debug/logging")
+async def debug_logging():
+    """Depth of the log queue and how many records were dropped because it was full"""
+    return log_pipeline.stats()
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
@@ -102,14 +188,18 @@ async def create_status_check(input: StatusCheckCreate):
     # Convert to dict and serialize datetime to ISO string for MongoDB
     doc = status_obj.model_dump()
     doc['timestamp'] = doc['timestamp'].isoformat()
+    # Native datetime copy drives the TTL index on status_checks
+    doc['created_at'] = status_obj.timestamp
     
     _ = await db.status_checks.insert_one(doc)
+    await retention_service.record_heartbeat(db, status_obj.client_name, status_obj.timestamp)
+    status_logger.info("Status check from %s", status_obj.client_name)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+async def get_status_checks(limit: int = Query(100, ge=1, le=1000)):
+    # Exclude MongoDB's _id field from the query results, newest first
+    status_checks = await db.status_checks.find({}, {"_id": 0, "created_at": 0}).sort("timestamp", -1).to_list(limit)
     
     # Convert ISO string timestamps back to datetime objects
     for check in status_checks:
@@ -118,102 +208,287 @@ async def get_status_checks():
     
     return status_checks
 
-# Background task for sending emails
-async def send_contact_emails(contact_dict: dict, contact_email: str, contact_name: str):
-    """Send emails in the background without blocking the response"""
+@api_router.get("/status/rollup", response_model=List[StatusCheckRollup])
+async def get_status_rollups(
+    granularity: str = Query("hour", pattern="^(minute|hour)$"),
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+):
+    return await retention_service.get_rollups(db, granularity, client_name, since, limit)
+
+# Emails are rendered and serialized in the request, then posted by the dispatcher's senders
+def queue_contact_emails(contact_dict: dict, contact_email: str, contact_name: str, submission_id: Optional[str] = None,
+                         spam_flagged: bool = False) -> int:
+    """Queue the admin notification and user confirmation; returns how many were queued
+
+    Flagged submissions only notify the admin, so a spammer's address never gets mail from us.
+    """
+    queued = 0
     try:
         admin_email = os.environ.get('SMTP_USER')
-        
-        # Prepare email tasks
-        email_tasks = []
-        
-        # Admin notification task
-        if admin_email:
-            admin_html = email_service.get_admin_notification_template(contact_dict)
-            admin_task = email_service.send_email(
-                to_email=admin_email,
-                subject=f"🔔 New Contact Form Submission from {contact_name}",
-                html_content=admin_html
-            )
-            email_tasks.append(('admin', admin_email, admin_task))
-        
-        # User confirmation task
-        user_html = email_service.get_user_confirmation_template(contact_name)
-        user_task = email_service.send_email(
-            to_email=contact_email,
-            subject="✅ We've Received Your Request - TechyHive",
-            html_content=user_html
-        )
-        email_tasks.append(('user', contact_email, user_task))
-        
-        # Send all emails in parallel
-        if email_tasks:
-            results = await asyncio.gather(*[task for _, _, task in email_tasks], return_exceptions=True)
-            
-            # Log results
-            for (email_type, recipient, _), result in zip(email_tasks, results):
-                if isinstance(result, Exception):
-                    logger.error(f"Failed to send {email_type} email to {recipient}: {str(result)}")
-                elif result:
-                    logger.info(f"{email_type.capitalize()} email sent to {recipient}")
-                else:
-                    logger.error(f"Failed to send {email_type} email to {recipient}")
+        subject = f"🔔 New Contact Form Submission from {contact_name}"
+        if spam_flagged:
+            subject = f"⚠️ [Possible spam] {subject}"
+        if admin_email and email_dispatcher.submit(
+            submission_id, "admin", admin_email, subject,
+            email_service.get_admin_notification_template, contact_dict,
+        ):
+            admission_controller.email_task_started()
+            queued += 1
+        if not spam_flagged and email_dispatcher.submit(
+            submission_id, "user", contact_email,
+            "✅ We've Received Your Request - TechyHive",
+            email_service.get_user_confirmation_template, contact_name,
+        ):
+            admission_controller.email_task_started()
+            queued += 1
     except Exception as e:
-        logger.error(f"Error sending emails: {str(e)}")
+        logger.error("Error queueing emails: %s", e)
+    return queued
+
+async def record_email_result(job: EmailJob, result):
+    """Called by the dispatcher once per queued email, after the send"""
+    try:
+        if isinstance(result, Exception):
+            logger.error("Failed to send %s email to %s: %s", job.kind, job.to_email, result)
+        elif result:
+            logger.info("%s email sent to %s", job.kind.capitalize(), job.to_email)
+            if isinstance(result, str) and job.submission_id and repository is not None:
+                # Keyed by SendGrid's message id so delivery events can be folded in later
+                await repository.record_email_message(job.submission_id, job.kind, result)
+                submission_broker.touch()
+        else:
+            logger.error("Failed to send %s email to %s", job.kind, job.to_email)
+    except Exception as e:
+        logger.error("Error recording %s email result: %s", job.kind, e)
+    finally:
+        admission_controller.email_task_finished()
+
+def submission_doc(contact_obj: ContactSubmission) -> dict:
+    # Datetimes are stored as ISO strings, which sort in time order
+    doc = contact_obj.model_dump()
+    doc['timestamp'] = doc['timestamp'].isoformat()
+    if doc['updated_at'] is not None:
+        doc['updated_at'] = doc['updated_at'].isoformat()
+    return doc
+
+def from_storage(submission: dict) -> dict:
+    # Convert ISO string timestamps back to datetime objects
+    for field in ('timestamp', 'updated_at'):
+        if isinstance(submission.get(field), str):
+            submission[field] = datetime.fromisoformat(submission[field])
+    return submission
+
+def contact_list_etag(request: Request) -> str:
+    # Strong validator: the submissions version plus the query, so every page and delta has its own tag
+    return f'"{submission_broker.version}-{zlib.crc32(request.url.query.encode()):08x}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+# updated_at is stamped before the write commits, so a slower write can land with an older
+# stamp than one a client has already seen. Watermarks stay this far behind to pick it up.
+SINCE_SAFETY_WINDOW = timedelta(seconds=float(os.environ.get('CONTACT_SINCE_SAFETY_SECONDS', '10')))
+
+# A watermark is an (updated_at, id) cursor, written "<UTC time>Z" or "<UTC time>Z_<id>" so it
+# can be pasted back as ?since= without URL-encoding (a raw "+00:00" would arrive as a space)
+WATERMARK_ID_SEPARATOR = "_"
+
+def parse_watermark(value: str) -> tuple:
+    """?since= value (a watermark or any ISO datetime, naive meaning UTC) as a storage cursor"""
+    stamp, _, after_id = value.partition(WATERMARK_ID_SEPARATOR)
+    try:
+        since = datetime.fromisoformat(stamp)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="since must be an ISO datetime or an X-Watermark value")
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return since.astimezone(timezone.utc).isoformat(), after_id
+
+def format_watermark(cursor: tuple) -> str:
+    updated_at, after_id = cursor
+    stamp = datetime.fromisoformat(updated_at).astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    return f"{stamp}{WATERMARK_ID_SEPARATOR}{after_id}" if after_id else stamp
+
+def next_watermark(since: tuple, submissions: List[dict], page_full: bool, queried_at: datetime) -> tuple:
+    """Cursor for the client's next poll; never ahead of a change it may not have seen"""
+    watermark = ((queried_at - SINCE_SAFETY_WINDOW).isoformat(), "")
+    if page_full:
+        # Rows past the cut are unseen: resume right after the last one returned. Inside the
+        # safety window this holds the cursor back until the window has passed the page.
+        last = submissions[-1]
+        watermark = min(watermark, (last["updated_at"], last["id"]))
+    return max(watermark, since)
 
 # Contact Form Endpoints
 @api_router.post("/contact", response_model=ContactSubmission)
-async def create_contact_submission(input: ContactSubmissionCreate, background_tasks: BackgroundTasks):
-    contact_dict = input.model_dump()
+async def create_contact_submission(input: ContactSubmissionCreate):
+    contact_dict = input.model_dump(exclude=SPAM_SCREEN_FIELDS)
     contact_obj = ContactSubmission(**contact_dict)
+    contact_obj.updated_at = contact_obj.timestamp
     
-    logger.info(f"New contact submission from {contact_obj.name} ({contact_obj.email})")
+    # Cheap spam screen before any write: bot evidence is quarantined and gets no email,
+    # content signals only flag the submission for the admin
+    spam_reasons = spam_filter.screen(input.email, input.description, input.website, input.form_token)
+    verdict = spam_filter.verdict(spam_reasons)
+    if verdict == "quarantine":
+        logger.warning("Quarantined contact submission %s: %s", contact_obj.id, ", ".join(spam_reasons))
+        if repository is not None:
+            try:
+                await repository.insert_quarantined(submission_doc(contact_obj), spam_reasons)
+            except Exception as e:
+                logger.error("Quarantine save error: %s", e)
+        # Same response as a real submission, so bots learn nothing
+        return contact_obj
     
-    # Save to MongoDB if available (non-blocking)
-    if db is not None:
+    # Per-address rate limit and pending email cap, before anything is written
+    admission_controller.check_contact(input.email)
+    
+    logger.info("New contact submission from %s (%s)", contact_obj.name, contact_obj.email)
+    # The sender gets the unflagged view either way
+    stored_obj = contact_obj
+    if verdict == "flag":
+        logger.warning("Flagged contact submission %s as possible spam: %s", contact_obj.id, ", ".join(spam_reasons))
+        stored_obj = contact_obj.model_copy(update={"spam_flagged": True, "spam_reasons": spam_reasons})
+    
+    # Save to storage if available (non-blocking)
+    if repository is not None:
         try:
-            doc = contact_obj.model_dump()
-            doc['timestamp'] = doc['timestamp'].isoformat()
-            _ = await db.contact_submissions.insert_one(doc)
-            logger.info("Contact submission saved to MongoDB")
+            with tracing.span("storage.insert", backend=repository.name):
+                await repository.insert(submission_doc(stored_obj))
+            logger.info("Contact submission saved to %s storage", repository.name)
+            # Only stored submissions reach the SSE feed
+            submission_broker.notify("created", stored_obj.model_dump(mode="json"))
         except Exception as e:
-            logger.error(f"MongoDB save error: {e}")
+            logger.error("Storage save error: %s", e)
     else:
-        logger.warning("MongoDB not available, skipping database save")
-    
-    # Schedule emails to be sent in the background
-    background_tasks.add_task(
-        send_contact_emails,
-        contact_dict,
-        contact_obj.email,
-        contact_obj.name
-    )
+        logger.warning("Storage not available, skipping database save")
     
-    logger.info("Emails scheduled for background sending")
+    # Render and serialize now; the dispatcher posts them after the response
+    queued = queue_contact_emails(contact_dict, contact_obj.email, contact_obj.name, contact_obj.id, stored_obj.spam_flagged)
+    
+    logger.info("%d emails queued for background sending", queued)
     
     # Return immediately without waiting for emails
     return contact_obj
 
+@api_router.get("/contact/token", response_model=FormToken)
+async def get_contact_form_token():
+    """Signed timestamp the form echoes back, for the minimum time-to-submit check"""
+    return FormToken(token=spam_filter.issue_form_token())
+
+@api_router.get("/contact/quarantine", response_model=List[ContactSubmission])
+async def get_quarantined_submissions(limit: int = Query(100, ge=1, le=1000), offset: int = Query(0, ge=0)):
+    """Submissions held back by hard spam signals (honeypot, blocklist, form token), newest first"""
+    return [from_storage(submission) for submission in await repository.list_quarantined(limit=limit, offset=offset)]
+
+@api_router.post("/contact/quarantine/{submission_id}/release", response_model=ContactSubmission)
+async def release_quarantined_submission(submission_id: str):
+    """Move a quarantined submission into the main list; no emails are sent for it"""
+    submission = await repository.release_quarantined(submission_id)
+    if submission is None:
+        raise HTTPException(status_code=404, detail="Quarantined submission not found")
+    
+    contact_obj = ContactSubmission(**from_storage(submission))
+    logger.info("Released quarantined contact submission %s", submission_id)
+    submission_broker.notify("created", contact_obj.model_dump(mode="json"))
+    return contact_obj
+
+@api_router.get("/contact/stream")
+async def stream_contact_submissions(last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events feed of new and updated submissions"""
+    subscriber = submission_broker.subscribe(last_event_id)
+    return StreamingResponse(
+        submission_broker.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @api_router.get("/contact", response_model=List[ContactSubmission])
-async def get_contact_submissions():
-    # Exclude MongoDB's _id field from the query results
-    submissions = await db.contact_submissions.find({}, {"_id": 0}).sort("timestamp", -1).to_list(1000)
+async def get_contact_submissions(
+    request: Request,
+    response: Response,
+    include_archived: bool = False,
+    limit: int = Query(1000, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    since: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Newest-first list, or with ?since= only submissions changed since the watermark (oldest change first)
+
+    Pass the previous response's X-Watermark back as ?since=. It deliberately lags behind the
+    newest change, so consecutive polls overlap: clients must dedupe by id, keeping the copy
+    with the latest updated_at.
+    """
+    # Taken before the query: a write racing it leaves an older tag on newer data, never the reverse
+    etag = contact_list_etag(request)
+    if etag_matches(if_none_match, etag):
+        # Nothing changed since the client's copy; storage is not touched
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
     
-    # Convert ISO string timestamps back to datetime objects
-    for submission in submissions:
-        if isinstance(submission['timestamp'], str):
-            submission['timestamp'] = datetime.fromisoformat(submission['timestamp'])
+    queried_at = datetime.now(timezone.utc)
+    if since is not None:
+        cursor = parse_watermark(since)
+        submissions = await repository.changed_since(*cursor, limit=limit, include_archived=include_archived)
+        page_full = len(submissions) == limit
+    else:
+        # Hot tier only by default; archived submissions are merged in on request
+        submissions = await repository.list(limit=limit, offset=offset, include_archived=include_archived)
+        cursor, page_full = ("", ""), False
     
-    return submissions
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Watermark"] = format_watermark(next_watermark(cursor, submissions, page_full, queried_at))
+    
+    return [from_storage(submission) for submission in submissions]
 
 @api_router.get("/contact/{submission_id}", response_model=ContactSubmission)
 async def get_contact_submission(submission_id: str):
-    submission = await db.contact_submissions.find_one({"id": submission_id}, {"_id": 0})
+    submission = await repository.get(submission_id)
     if submission:
-        if isinstance(submission['timestamp'], str):
-            submission['timestamp'] = datetime.fromisoformat(submission['timestamp'])
-        return submission
-    return {"error": "Submission not found"}
+        return from_storage(submission)
+    raise HTTPException(status_code=404, detail="Submission not found")
+
+@api_router.patch("/contact/{submission_id}/status", response_model=ContactSubmission)
+async def update_contact_status(submission_id: str, input: ContactStatusUpdate):
+    submission = await repository.update_status(submission_id, input.status)
+    if submission is None:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    
+    contact_obj = ContactSubmission(**from_storage(submission))
+    submission_broker.notify("updated", contact_obj.model_dump(mode="json"))
+    return contact_obj
+
+# Closest to the router, so profiles cover routing, validation and the handler
+app.add_middleware(ProfilingMiddleware)
+
+# Between the body limit (outside) and profiling (inside): oversized bodies never take a slot,
+# shed requests are never profiled, and shed responses still get CORS and request id headers
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+# Oversized bodies are refused before admission or JSON parsing sees them
+app.add_middleware(BodySizeLimitMiddleware)
+
+# SendGrid Event Webhook
+@api_router.post("/email/events", status_code=202)
+async def receive_email_events(request: Request):
+    """Accept a SendGrid event batch; it is applied to submissions in the background"""
+    body = await request.body()
+    if not email_event_ingestor.verify(body, request.headers.get(SIGNATURE_HEADER), request.headers.get(TIMESTAMP_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid webhook signature")
+    events = parse_events(body)
+    if events is None:
+        raise HTTPException(status_code=400, detail="Expected a JSON array of events")
+    if not email_event_ingestor.submit(events):
+        # Non-2xx makes SendGrid retry the batch later
+        raise HTTPException(status_code=503, detail="Event backlog full", headers={"Retry-After": "30"})
+    return {"accepted": len(events)}
 
 # Add CORS middleware BEFORE including routes
 app.add_middleware(
@@ -229,13 +504,56 @@ app.add_middleware(
     ],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Watermark"],
 )
 
+# Outermost, so the request id covers CORS handling and background tasks
+app.add_middleware(TracingMiddleware)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+background_jobs = []
+
+@app.on_event("startup")
+async def start_background_jobs():
+    background_jobs.append(asyncio.create_task(tracer.run_exporter()))
+    spam_filter.install_reload_signal(asyncio.get_running_loop())
+    if repository is not None:
+        await repository.setup()
+    # Raw events are kept in Mongo only when submissions live there too
+    mongo_storage = isinstance(repository, MongoSubmissionRepository)
+    background_jobs.append(asyncio.create_task(email_dispatcher.run(record_email_result)))
+    background_jobs.append(asyncio.create_task(
+        email_event_ingestor.run(repository, db if mongo_storage else None, on_applied=submission_broker.touch)
+    ))
+    if db is None:
+        return
+    try:
+        await retention_service.ensure_collections(db)
+        if mongo_storage:
+            await email_event_ingestor.ensure_indexes(db)
+    except Exception as e:
+        logger.error("Mongo index setup error: %s", e)
+    if not mongo_storage:
+        # Archiving and change streams only apply to submissions stored in Mongo
+        return
+    background_jobs.append(asyncio.create_task(retention_service.run_archive_loop(db, on_archived=submission_broker.touch)))
+    if submission_broker.source == "changestream":
+        background_jobs.append(asyncio.create_task(submission_broker.run_change_stream(db.contact_submissions)))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Queued emails and webhook batches still need the repository, so drain them first
+    await email_dispatcher.drain()
+    await email_event_ingestor.drain()
+    for job in background_jobs:
+        job.cancel()
+    await asyncio.gather(*background_jobs, return_exceptions=True)
+    if repository is not None:
+        await repository.close()
+    await email_service.close()
     if client is not None:
         client.close()
-        logger.info("MongoDB connection closed")
\ No newline at end of file
+        logger.info("MongoDB connection closed")
+    log_pipeline.shutdown()
\ No newline at end of file
@@ -0,0 +1,153 @@
+import os
+import re
+import hmac
+import math
+import time
+import signal
+import asyncio
+import hashlib
+import logging
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Matched against the lower-cased description. Whole words only, and on its own a
+# hit is just one signal: real briefs mention casinos, betting models or SEO too
+SPAM_TERMS_RE = re.compile(
+    r"\b(?:viagra|cialis|casino|betting|porn|escort|backlinks?|seo\s+services?|"
+    r"crypto\s+invest|forex\s+signals?|loan\s+offer|guest\s+post|"
+    r"rank\s+your\s+(?:site|website)|increase\s+(?:your\s+)?traffic)\b"
+)
+
+# Bot-only evidence: quarantined silently. Anything else is a content signal that
+# only flags a stored submission once several of them agree
+HARD_SIGNALS = {"honeypot", "blocklisted_sender", "bad_form_token", "form_token_expired", "missing_form_token"}
+
+
+class BloomFilter:
+    """Compact membership filter; false positives possible, false negatives not"""
+
+    def __init__(self, items: Iterable[str], false_positive_rate: float = 0.001):
+        items = list(items)
+        n = max(len(items), 1)
+        self.size = max(1024, int(-n * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        # Optimal k depends only on the target rate; deriving it from an inflated
+        # minimum size would give many correlated double-hash probes
+        self.hashes = max(1, round(-math.log2(false_positive_rate)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = len(items)
+        for item in items:
+            for position in self._positions(item):
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    def _positions(self, item: str):
+        # Double hashing from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class SpamFilter:
+    def __init__(self):
+        self.enabled = os.environ.get('SPAM_FILTER_ENABLED', 'true').lower() == 'true'
+        self.blocklist_path = os.environ.get('SPAM_BLOCKLIST_PATH')
+        self.max_links = int(os.environ.get('SPAM_MAX_LINKS', '2'))
+        # Signed form tokens are only checked when a secret is shared by all workers
+        self.form_secret = os.environ.get('SPAM_FORM_SECRET', '')
+        self.require_form_token = os.environ.get('SPAM_REQUIRE_FORM_TOKEN', 'false').lower() == 'true'
+        self.min_submit_seconds = float(os.environ.get('SPAM_MIN_SUBMIT_SECONDS', '3'))
+        self.max_token_age_seconds = float(os.environ.get('SPAM_MAX_TOKEN_AGE_SECONDS', str(24 * 3600)))
+        # Content signals needed before a submission is flagged for review
+        self.flag_min_signals = int(os.environ.get('SPAM_FLAG_MIN_SIGNALS', '2'))
+        self.blocklist = BloomFilter([])
+        self.quarantined = 0
+        self.flagged = 0
+        if self.blocklist_path:
+            self.reload()
+
+    def reload(self):
+        """(Re)build the blocklist from SPAM_BLOCKLIST_PATH: one email or domain per line"""
+        if not self.blocklist_path:
+            return
+        try:
+            with open(self.blocklist_path, encoding="utf-8") as f:
+                entries = [line.strip().lower().lstrip("@") for line in f]
+        except OSError as e:
+            logger.error("Could not load spam blocklist %s: %s", self.blocklist_path, e)
+            return
+        entries = [entry for entry in entries if entry and not entry.startswith("#")]
+        self.blocklist = BloomFilter(entries)
+        logger.info("Loaded %d spam blocklist entries (%d bytes)", len(entries), len(self.blocklist.bits))
+
+    def install_reload_signal(self, loop: asyncio.AbstractEventLoop):
+        """Reload the blocklist on SIGHUP, where the platform supports it"""
+        try:
+            loop.add_signal_handler(signal.SIGHUP, lambda: loop.run_in_executor(None, self.reload))
+        except (AttributeError, NotImplementedError, RuntimeError):
+            logger.info("SIGHUP blocklist reload not available on this platform")
+
+    def issue_form_token(self) -> Optional[str]:
+        if not self.form_secret:
+            return None
+        issued = str(int(time.time() * 1000))
+        return f"{issued}.{self._sign(issued)}"
+
+    def _sign(self, issued: str) -> str:
+        return hmac.new(self.form_secret.encode(), issued.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def _check_form_token(self, token: str) -> Optional[str]:
+        if not self.form_secret:
+            return None
+        if not token:
+            return "missing_form_token" if self.require_form_token else None
+        issued, _, signature = token.partition(".")
+        if not issued.isdigit() or not hmac.compare_digest(signature, self._sign(issued)):
+            return "bad_form_token"
+        age = time.time() - int(issued) / 1000
+        if age < self.min_submit_seconds:
+            return "submitted_too_fast"
+        if age > self.max_token_age_seconds:
+            return "form_token_expired"
+        return None
+
+    def screen(self, email: str, description: str, honeypot: str = "", form_token: str = "") -> List[str]:
+        """Reasons the submission looks like spam; an empty list means it passed"""
+        if not self.enabled:
+            return []
+        reasons = []
+        if honeypot:
+            reasons.append("honeypot")
+        token_problem = self._check_form_token(form_token)
+        if token_problem:
+            reasons.append(token_problem)
+
+        email = email.lower()
+        domain = email.rpartition("@")[2]
+        if self.blocklist.count and (email in self.blocklist or domain in self.blocklist):
+            reasons.append("blocklisted_sender")
+
+        text = description.lower()
+        if text.count("http") + text.count("www.") > self.max_links or "[url=" in text or "[link=" in text:
+            reasons.append("links")
+        if SPAM_TERMS_RE.search(text):
+            reasons.append("spam_terms")
+
+        return reasons
+
+    def verdict(self, reasons: List[str]) -> Optional[str]:
+        """"quarantine" on any hard signal, "flag" when enough content signals agree, else None"""
+        if any(reason in HARD_SIGNALS for reason in reasons):
+            self.quarantined += 1
+            return "quarantine"
+        if reasons and len(reasons) >= self.flag_min_signals:
+            self.flagged += 1
+            return "flag"
+        return None
+
+
+# Create a singleton instance
+spam_filter = SpamFilter()
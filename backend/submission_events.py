@@ -0,0 +1,164 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class SubmissionBroker:
+    """In-process pub/sub for contact submission changes, consumed by the SSE feed"""
+
+    def __init__(self):
+        self.queue_size = int(os.environ.get('CONTACT_STREAM_QUEUE_SIZE', '100'))
+        self.history_size = int(os.environ.get('CONTACT_STREAM_HISTORY', '500'))
+        self.heartbeat_seconds = float(os.environ.get('CONTACT_STREAM_HEARTBEAT_SECONDS', '15'))
+        # "memory": write endpoints publish directly; "changestream": a Mongo change
+        # stream feeds every worker so writes on other processes are seen too
+        self.source = os.environ.get('CONTACT_STREAM_SOURCE', 'memory')
+
+        # Event ids are "<boot>-<seq>" so a resume against another process is detected
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._seq = 0
+        # Bumped on every change to the submissions, published or not; list ETags derive from it
+        self._version = 0
+        self._history = deque(maxlen=self.history_size)
+        self._subscribers = set()
+        self.dropped_subscribers = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def version(self) -> str:
+        """Opaque submissions version; with the "memory" source it only sees this process's writes"""
+        return f"{self.boot_id}-{self._version}"
+
+    def touch(self):
+        """Record a change that has no SSE event (email statuses, archiving)"""
+        if self.source == "memory":
+            self._version += 1
+
+    def notify(self, event: str, submission: dict):
+        """Called by write endpoints; a no-op when the change stream is the source"""
+        if self.source == "memory":
+            self.publish(event, submission)
+
+    def publish(self, event: str, submission: dict):
+        self._version += 1
+        self._seq += 1
+        message = self._format(f"{self.boot_id}-{self._seq}", event, json.dumps(submission, default=str))
+        self._history.append((self._seq, message))
+
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: cut it loose instead of buffering without bound
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        subscriber.dropped = True
+        self._subscribers.discard(subscriber)
+        self.dropped_subscribers += 1
+        # Wake its stream now rather than at the next keepalive; the client resumes
+        # from its Last-Event-ID, so the discarded backlog is replayed from history
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        logger.warning("Dropped slow contact stream subscriber")
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        replay = self._replay(last_event_id)
+        if len(replay) > self.queue_size:
+            # A partial replay would let the next live event id carry the client past the gap
+            replay = [self._format(None, "reset", "{}")]
+        for message in replay:
+            subscriber.queue.put_nowait(message)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def _replay(self, last_event_id: Optional[str]):
+        if not last_event_id:
+            return []
+        boot_id, _, seq = last_event_id.partition("-")
+        if boot_id != self.boot_id or not seq.isdigit():
+            # Unknown history: tell the client to refetch the full list
+            return [self._format(None, "reset", "{}")]
+        last_seq = int(seq)
+        if self._history and self._history[0][0] > last_seq + 1:
+            return [self._format(None, "reset", "{}")]
+        return [message for event_seq, message in self._history if event_seq > last_seq]
+
+    @staticmethod
+    def _format(event_id: Optional[str], event: str, data: str) -> str:
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {data}")
+        return "\n".join(lines) + "\n\n"
+
+    async def stream(self, subscriber: Subscriber):
+        """Async generator of SSE frames for one subscriber"""
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.dropped:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Comment frame keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def run_change_stream(self, collection):
+        """Publish inserts/updates seen on a Mongo change stream (requires a replica set)"""
+        resume_token = None
+        while True:
+            try:
+                async with collection.watch(
+                    [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}],
+                    full_document="updateLookup",
+                    resume_after=resume_token,
+                ) as stream:
+                    logger.info("Contact change stream started")
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        if change["operationType"] == "delete":
+                            # Archived out of the hot collection: no event, but cached lists are stale
+                            self._version += 1
+                            continue
+                        document = change.get("fullDocument")
+                        if not document:
+                            continue
+                        document.pop("_id", None)
+                        event = "created" if change["operationType"] == "insert" else "updated"
+                        self.publish(event, document)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Contact change stream error: %s", e)
+                await asyncio.sleep(5)
+
+
+# Create a singleton instance
+submission_broker = SubmissionBroker()
@@ -0,0 +1,339 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import inspect
+import logging
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import httpx
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_trace_var: ContextVar[Optional["TraceContext"]] = ContextVar("trace", default=None)
+_span_var: ContextVar[Optional["Span"]] = ContextVar("span", default=None)
+_validation_var: ContextVar[Optional["Span"]] = ContextVar("validation", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps every log record with the current request id"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class TraceContext:
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+
+
+class Span:
+    def __init__(self, name: str, trace: TraceContext, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        # A span whose parent already finished (e.g. a background task that runs after
+        # the response was sent) starts its own segment and is exported on its own
+        if parent is not None and parent.end_ns is None:
+            self.segment = parent.segment
+        else:
+            self.segment = []
+        self.segment.append(self)
+        self.is_segment_root = self.segment[0] is self
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.is_segment_root:
+            tracer.finish_segment(self.segment)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "request_id": self.attributes.get("request_id"),
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = os.environ.get('TRACING_ENABLED', 'true').lower() == 'true'
+        # Head sampling rate, plus tail sampling of any segment slower than the threshold
+        self.sample_rate = float(os.environ.get('TRACE_SAMPLE_RATE', '0.01'))
+        self.slow_ms = float(os.environ.get('TRACE_SLOW_MS', '500'))
+        self.export_path = os.environ.get('TRACE_EXPORT_PATH')
+        self.otlp_endpoint = os.environ.get('TRACE_OTLP_ENDPOINT')
+        self.service_name = os.environ.get('TRACE_SERVICE_NAME', 'techyhive-backend')
+        self.flush_interval = float(os.environ.get('TRACE_FLUSH_INTERVAL_SECONDS', '5'))
+
+        self._pending = deque(maxlen=int(os.environ.get('TRACE_BUFFER_SIZE', '1000')))
+        self.dropped_segments = 0
+        self.exported_segments = 0
+
+    @property
+    def exporting(self) -> bool:
+        return bool(self.export_path or self.otlp_endpoint)
+
+    @property
+    def recording(self) -> bool:
+        """Spans are only built when they can be exported; request ids are set either way"""
+        return self.enabled and self.exporting
+
+    def start_trace(self, request_id: Optional[str] = None):
+        """Set the request id and trace context for the current task; returns reset tokens"""
+        request_id = request_id or uuid.uuid4().hex
+        trace_id = request_id if _is_hex(request_id, 32) else uuid.uuid4().hex
+        trace = TraceContext(trace_id, random.random() < self.sample_rate)
+        return request_id_var.set(request_id), _trace_var.set(trace)
+
+    def end_trace(self, tokens):
+        request_token, trace_token = tokens
+        _trace_var.reset(trace_token)
+        request_id_var.reset(request_token)
+
+    def finish_segment(self, segment: list):
+        root = segment[0]
+        if not (root.trace.sampled or root.duration_ms >= self.slow_ms) or not self.exporting:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped_segments += 1
+        self._pending.append([s.to_dict() for s in segment if s.end_ns is not None])
+
+    async def run_exporter(self):
+        """Flush buffered segments to the configured sinks until cancelled"""
+        if not self.exporting:
+            return
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch = list(self._pending)
+        self._pending.clear()
+        spans = [span for segment in batch for span in segment]
+        try:
+            if self.export_path:
+                await asyncio.to_thread(self._write_jsonl, spans)
+            if self.otlp_endpoint:
+                await self._post_otlp(spans)
+            self.exported_segments += len(batch)
+        except Exception as e:
+            logger.error("Trace export failed: %s", e)
+
+    def _write_jsonl(self, spans: list):
+        with open(self.export_path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+    async def _post_otlp(self, spans: list):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "techyhive.tracing"},
+                    "spans": [_otlp_span(span) for span in spans],
+                }],
+            }]
+        }
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.post(f"{self.otlp_endpoint.rstrip('/')}/v1/traces", json=payload)
+            response.raise_for_status()
+
+
+def _is_hex(value: str, length: int) -> bool:
+    if len(value) != length:
+        return False
+    try:
+        int(value, 16)
+    except ValueError:
+        return False
+    return True
+
+
+def _otlp_attr(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(span: dict) -> dict:
+    end_ns = span["start_ns"] + int(span["duration_ms"] * 1e6)
+    otlp = {
+        "traceId": span["trace_id"],
+        "spanId": span["span_id"],
+        "name": span["name"],
+        "kind": 1,
+        "startTimeUnixNano": str(span["start_ns"]),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [_otlp_attr(k, v) for k, v in span["attributes"].items() if v is not None],
+        "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+    }
+    if span["parent_id"]:
+        otlp["parentSpanId"] = span["parent_id"]
+    return otlp
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Create a span under the current one without making it current"""
+    trace = _trace_var.get()
+    if trace is None or not tracer.recording:
+        return None
+    attributes.setdefault("request_id", request_id_var.get())
+    return Span(name, trace, _span_var.get(), attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block of work as a child of the current span"""
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _span_var.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _span_var.reset(token)
+        current.finish()
+
+
+def current_span() -> Optional[Span]:
+    return _span_var.get()
+
+
+class TracedRoute(APIRoute):
+    """Route class that times body parsing and validation as a `request.validate` span
+
+    FastAPI parses and validates inside one handler, so the span opens when that handler
+    starts and closes as the endpoint is entered (or with the 422 when validation fails).
+    """
+
+    def get_route_handler(self):
+        endpoint = self.dependant.call
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def call(*args, **kwargs):
+                _finish_validation()
+                return await endpoint(*args, **kwargs)
+        else:
+            @functools.wraps(endpoint)
+            def call(*args, **kwargs):
+                _finish_validation()
+                return endpoint(*args, **kwargs)
+        self.dependant.call = call
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            validation = start_span("request.validate", route=self.path)
+            token = _validation_var.set(validation)
+            try:
+                return await handler(request)
+            except BaseException as e:
+                if validation is not None and validation.end_ns is None:
+                    validation.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                if validation is not None:
+                    validation.finish()
+                _validation_var.reset(token)
+
+        return traced_handler
+
+
+def _finish_validation():
+    validation = _validation_var.get()
+    if validation is not None:
+        validation.finish()
+
+
+class TracingMiddleware:
+    """ASGI middleware that assigns a request id and opens the root span"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        tokens = tracer.start_trace(request_id[:128])
+        request_id = request_id_var.get()
+        root = start_span(f"{scope['method']} {scope['path']}", **{"http.method": scope["method"], "http.path": scope["path"]})
+        span_token = _span_var.set(root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+                if root is not None:
+                    root.set_attribute("http.status_code", message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body") and root is not None:
+                # Close the request span once the response is out; background
+                # tasks that run afterwards export as their own segment
+                root.finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            if root is not None:
+                root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if root is not None:
+                root.finish()
+            _span_var.reset(span_token)
+            tracer.end_trace(tokens)
+
+
+# Create a singleton instance
+tracer = Tracer()
@@ -23,6 +23,23 @@ const iconMap = {
   Sparkles
 };
 
+// Railway backend URL
+const backendUrl = 'https://techyhive-production.up.railway.app';
+
+// Signed timestamp the backend checks for bots that submit instantly or replay old forms.
+// Empty when the backend has no form secret configured, or when it cannot be reached.
+const fetchFormToken = async () => {
+  try {
+    const response = await fetch(`${backendUrl}/api/contact/token`);
+    if (!response.ok) return '';
+    const data = await response.json();
+    return data.token || '';
+  } catch (error) {
+    console.error('Error fetching form token:', error);
+    return '';
+  }
+};
+
 const Home = () => {
   const [formData, setFormData] = useState({
     name: '',
@@ -32,13 +49,19 @@ const Home = () => {
     domain: '',
     deadline: '',
     budget: '',
-    description: ''
+    description: '',
+    website: ''
   });
 
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [mobileMenuOpen, setMobileMenuOpen] = useState(false);
   const [formErrors, setFormErrors] = useState({});
   const [currentTestimonial, setCurrentTestimonial] = useState(0);
+  const [formToken, setFormToken] = useState('');
+
+  useEffect(() => {
+    fetchFormToken().then(setFormToken);
+  }, []);
 
   // Auto-play testimonials carousel
   useEffect(() => {
@@ -140,8 +163,6 @@ const Home = () => {
     setIsSubmitting(true);
 
     try {
-      // Railway backend URL
-      const backendUrl = 'https://techyhive-production.up.railway.app';
       console.log('Submitting to:', `${backendUrl}/api/contact`);
       
       // Add timeout controller (10 seconds - Railway is always warm)
@@ -161,7 +182,9 @@ const Home = () => {
           domain: formData.domain,
           deadline: formData.deadline,
           budget: formData.budget,
-          description: formData.description
+          description: formData.description,
+          website: formData.website,
+          form_token: formToken
         }),
         signal: controller.signal
       });
@@ -183,6 +206,8 @@ const Home = () => {
         duration: 5000,
       });
       
+      // Each token is one form's start time, so the next submission gets a fresh one
+      fetchFormToken().then(setFormToken);
       setFormData({
         name: '',
         email: '',
@@ -191,7 +216,8 @@ const Home = () => {
         domain: '',
         deadline: '',
         budget: '',
-        description: ''
+        description: '',
+        website: ''
       });
     } catch (error) {
       console.error('Error submitting form:', error);
@@ -1546,6 +1572,19 @@ const Home = () => {
             <Card className="bg-slate-800/70 backdrop-blur-sm border-slate-700 shadow-2xl shadow-orange-500/10">
               <CardContent className="pt-6">
                 <form onSubmit={handleSubmit} className="space-y-6">
+                  {/* Honeypot: hidden from people and screen readers, filled in by bots */}
+                  <div aria-hidden="true" className="absolute -left-[9999px] w-px h-px overflow-hidden">
+                    <label htmlFor="website">Website</label>
+                    <input
+                      id="website"
+                      type="text"
+                      name="website"
+                      value={formData.website}
+                      onChange={handleInputChange}
+                      tabIndex={-1}
+                      autoComplete="off"
+                    />
+                  </div>
                   <div className="grid md:grid-cols-2 gap-4">
                     <div>
                       <label className="text-sm text-gray-300 mb-2 block">Name *</label>
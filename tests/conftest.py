@@ -0,0 +1,101 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Set before server is imported: every singleton reads its configuration at import time.
+# load_dotenv does not override these, so a developer's backend/.env cannot leak in.
+os.environ.update({
+    "STORAGE_BACKEND": "mongo",
+    "MONGO_URL": "mongodb://127.0.0.1:1",
+    "SMTP_USER": "admin@techyhive.test",
+    "LOG_LEVEL": "WARNING",
+    "LOG_FORMAT": "text",
+    "TRACE_SAMPLE_RATE": "0",
+    "PROFILING_ENABLED": "false",
+    "CONTACT_STREAM_SOURCE": "memory",
+    # Concurrency tests fire hundreds of posts from one client; limits get their own tests
+    "ADMISSION_CONTACT_CONCURRENCY": "1000",
+    "ADMISSION_CONTACT_QUEUE": "1000",
+    "ADMISSION_WRITE_CONCURRENCY": "1000",
+    "ADMISSION_WRITE_QUEUE": "1000",
+    "ADMISSION_READ_CONCURRENCY": "1000",
+    "ADMISSION_READ_QUEUE": "1000",
+    "ADMISSION_MAX_PENDING_EMAILS": "10000",
+    "ADMISSION_IP_RATE_PER_MINUTE": "600000",
+    "ADMISSION_IP_BURST": "10000",
+    "ADMISSION_EMAIL_RATE_PER_HOUR": "3600000",
+    "ADMISSION_EMAIL_BURST": "10000",
+    # Otherwise derived from the pending cap above, i.e. hundreds of idle senders per test
+    "EMAIL_SEND_CONCURRENCY": "32",
+})
+for name in ("SENDGRID_API_KEY", "SENDGRID_WEBHOOK_PUBLIC_KEY", "SPAM_FORM_SECRET", "SPAM_BLOCKLIST_PATH",
+             "DEBUG_TOKEN", "TRACE_EXPORT_PATH", "TRACE_OTLP_ENDPOINT"):
+    os.environ.pop(name, None)
+
+import server  # noqa: E402
+from admission import admission_controller  # noqa: E402
+from email_dispatch import email_dispatcher  # noqa: E402
+from email_events import email_event_ingestor  # noqa: E402
+from repository import MongoSubmissionRepository  # noqa: E402
+from spam_filter import spam_filter  # noqa: E402
+from submission_events import submission_broker  # noqa: E402
+
+from tests.fakes import FakeMotorDatabase, RecordingEmailService  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fake_db():
+    return FakeMotorDatabase()
+
+
+@pytest.fixture
+def email_outbox(monkeypatch):
+    outbox = RecordingEmailService()
+    monkeypatch.setattr(server, "email_service", outbox)
+    return outbox
+
+
+@pytest.fixture
+def repository(fake_db, monkeypatch):
+    repo = MongoSubmissionRepository(fake_db)
+    monkeypatch.setattr(server, "db", fake_db)
+    monkeypatch.setattr(server, "repository", repo)
+    return repo
+
+
+@pytest.fixture
+async def client(repository, email_outbox):
+    # The middleware stack holds these singletons, so they are reset in place; this also
+    # drops asyncio primitives bound to a previous test's event loop
+    for singleton in (admission_controller, submission_broker, email_event_ingestor, spam_filter):
+        singleton.__init__()
+    email_dispatcher.__init__(email_outbox)
+    # Started the way the startup hook does; emails go out after responses, so
+    # tests await email_dispatcher.join() before looking at the outbox
+    senders = asyncio.create_task(email_dispatcher.run(server.record_email_result))
+    transport = httpx.ASGITransport(app=server.app, client=("203.0.113.7", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http_client:
+        yield http_client
+    senders.cancel()
+    await asyncio.gather(senders, return_exceptions=True)
+
+
+@pytest.fixture
+async def ingestor(client, repository, fake_db):
+    """Runs the webhook ingestor the way the startup hook does"""
+    task = asyncio.create_task(email_event_ingestor.run(repository, fake_db, on_applied=submission_broker.touch))
+    yield email_event_ingestor
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,313 @@
+"""
+In-process stand-ins for the backend's external services.
+
+FakeMotorDatabase implements the subset of Motor's async collection API the
+backend uses (inserts, find/sort/skip/limit cursors, find_one_and_update/delete,
+bulk_write with UpdateOne/ReplaceOne, positional updates, indexes), so the
+real MongoSubmissionRepository and RetentionService code paths run offline.
+RecordingEmailService keeps templating and payload building real and
+replaces the SendGrid POST with an outbox.
+"""
+
+import asyncio
+import copy
+import itertools
+import json
+import uuid
+from typing import List, Optional
+
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+
+from email_service import EmailService
+
+_MISSING = object()
+
+
+def _get_path(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if op == "$in":
+        return value in operand
+    if op == "$ne":
+        return value != operand
+    if value is _MISSING or value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise NotImplementedError(f"FakeMotor does not support {op}")
+
+
+def _matches_value(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for op, operand in condition.items():
+            if op == "$elemMatch":
+                if not isinstance(value, list) or not any(matches(item, operand) for item in value):
+                    return False
+            elif not _compare(value, op, operand):
+                return False
+        return True
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return (None if value is _MISSING else value) == condition
+
+
+def matches(doc: dict, query: dict) -> bool:
+    return all(
+        any(matches(doc, branch) for branch in condition) if path == "$or"
+        else _matches_value(_get_path(doc, path), condition)
+        for path, condition in query.items()
+    )
+
+
+def _positional_index(doc: dict, query: dict, array_field: str) -> int:
+    """Index the positional $ operator resolves to: the first array element the query matched"""
+    items = doc.get(array_field, [])
+    condition = query.get(array_field)
+    for index, item in enumerate(items):
+        if isinstance(condition, dict) and "$elemMatch" in condition:
+            if matches(item, condition["$elemMatch"]):
+                return index
+        elif _matches_value(item, condition):
+            return index
+    raise ValueError(f"positional operator did not find a match in {array_field}")
+
+
+def _set_path(doc: dict, path: str, value, query: dict):
+    parts = path.split(".")
+    target = doc
+    for part, following in zip(parts[:-1], parts[1:]):
+        if part == "$":
+            continue
+        if following == "$":
+            target = target.setdefault(part, [])[_positional_index(doc, query, part)]
+        else:
+            target = target.setdefault(part, {})
+    target[parts[-1]] = value
+
+
+def _sort_key(field: str):
+    # Missing fields sort first ascending, like Mongo's null ordering
+    def key(doc: dict):
+        value = _get_path(doc, field)
+        return (False, 0) if value is _MISSING or value is None else (True, value)
+    return key
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = {key for key, flag in projection.items() if flag and key != "_id"}
+    if included:
+        keep = included | ({"_id"} if projection.get("_id", 1) else set())
+        return {key: value for key, value in doc.items() if key in keep}
+    return {key: value for key, value in doc.items() if projection.get(key, 1)}
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query: dict, projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction: int = 1):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    async def to_list(self, length: Optional[int]):
+        await asyncio.sleep(0)
+        docs = [doc for doc in self._collection.docs if matches(doc, self._query)]
+        for field, direction in reversed(self._sort):
+            docs.sort(key=_sort_key(field), reverse=direction < 0)
+        docs = docs[self._skip:]
+        for bound in (self._limit, length):
+            if bound:
+                docs = docs[:bound]
+        return [_project(doc, self._projection) for doc in docs]
+
+
+class FakeCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: List[dict] = []
+        self.indexes = {}
+        self._ids = itertools.count(1)
+
+    def _store(self, doc: dict):
+        if "_id" not in doc:
+            doc["_id"] = next(self._ids)
+        self.docs.append(copy.deepcopy(doc))
+
+    async def insert_one(self, doc: dict):
+        await asyncio.sleep(0)
+        self._store(doc)
+
+    async def insert_many(self, docs: List[dict], ordered: bool = True):
+        await asyncio.sleep(0)
+        if not docs:
+            raise TypeError("documents must be a non-empty list")
+        for doc in docs:
+            self._store(doc)
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> FakeCursor:
+        return FakeCursor(self, query or {}, projection)
+
+    async def find_one(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        await asyncio.sleep(0)
+        for doc in self.docs:
+            if matches(doc, query):
+                return _project(doc, projection)
+        return None
+
+    def _apply_update(self, doc: dict, update: dict, query: dict, inserted: bool):
+        for op, fields in update.items():
+            for path, value in fields.items():
+                if op == "$set":
+                    _set_path(doc, path, copy.deepcopy(value), query)
+                elif op == "$setOnInsert":
+                    if inserted:
+                        _set_path(doc, path, copy.deepcopy(value), query)
+                elif op == "$inc":
+                    doc[path] = doc.get(path, 0) + value
+                elif op == "$max":
+                    if path not in doc or value > doc[path]:
+                        doc[path] = value
+                elif op == "$push":
+                    doc.setdefault(path, []).append(copy.deepcopy(value))
+                else:
+                    raise NotImplementedError(f"FakeMotor does not support {op}")
+
+    def _update(self, query: dict, update: dict, upsert: bool = False) -> Optional[dict]:
+        for doc in self.docs:
+            if matches(doc, query):
+                self._apply_update(doc, update, query, inserted=False)
+                return doc
+        if upsert:
+            doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            self._apply_update(doc, update, query, inserted=True)
+            self._store(doc)
+            return self.docs[-1]
+        return None
+
+    def _replace(self, query: dict, replacement: dict, upsert: bool = False):
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                self.docs[i] = {"_id": doc["_id"], **copy.deepcopy(replacement)}
+                return
+        if upsert:
+            self._store(dict(replacement))
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        await asyncio.sleep(0)
+        self._update(query, update, upsert)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection: Optional[dict] = None,
+                                  return_document=ReturnDocument.BEFORE, upsert: bool = False):
+        await asyncio.sleep(0)
+        before = next((copy.deepcopy(doc) for doc in self.docs if matches(doc, query)), None)
+        after = self._update(query, update, upsert)
+        result = after if return_document == ReturnDocument.AFTER else before
+        return _project(result, projection) if result is not None else None
+
+    async def find_one_and_delete(self, query: dict, projection: Optional[dict] = None):
+        await asyncio.sleep(0)
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                return _project(self.docs.pop(i), projection)
+        return None
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        await asyncio.sleep(0)
+        for request in requests:
+            if isinstance(request, UpdateOne):
+                self._update(request._filter, request._doc, request._upsert)
+            elif isinstance(request, ReplaceOne):
+                self._replace(request._filter, request._doc, request._upsert)
+            else:
+                raise NotImplementedError(f"FakeMotor does not support {type(request).__name__}")
+
+    async def delete_many(self, query: dict):
+        await asyncio.sleep(0)
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+
+    async def create_index(self, keys, name: Optional[str] = None, **options):
+        await asyncio.sleep(0)
+        self.indexes[name or str(keys)] = {"keys": keys, **options}
+        return name
+
+
+class FakeMotorDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def create_collection(self, name: str, **options):
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        return {"ok": 1}
+
+
+class RecordingEmailService(EmailService):
+    """Real templates and payloads, no network: posts are recorded and get a SendGrid-style message id"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent: List[dict] = []
+        self.fail_for = set()
+
+    async def post_payload(self, to_email: str, body: bytes):
+        await asyncio.sleep(0)
+        if to_email in self.fail_for:
+            return False
+        payload = json.loads(body)
+        message_id = uuid.uuid4().hex[:22]
+        self.sent.append({
+            "to": to_email,
+            "subject": payload["personalizations"][0]["subject"],
+            "html": payload["content"][0]["value"],
+            "payload": payload,
+            "message_id": message_id,
+        })
+        return message_id
@@ -0,0 +1,24 @@
+import asyncio
+
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met before timeout")
+        await asyncio.sleep(0.001)
+
+
+def contact_payload(i: int = 0, **overrides) -> dict:
+    payload = {
+        "name": f"Client {i}",
+        "email": f"client{i}@example.com",
+        "phone": "+91 98765 43210",
+        "project_type": "Web Development",
+        "domain": "E-commerce",
+        "deadline": "2 months",
+        "budget": "$5000-$10000",
+        "description": "Need a modern e-commerce website with payment integration",
+    }
+    payload.update(overrides)
+    return payload
@@ -0,0 +1,93 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from admission import admission_controller
+from email_dispatch import email_dispatcher
+
+from tests.helpers import contact_payload, wait_for
+
+pytestmark = pytest.mark.anyio
+
+POSTS = 300
+
+
+async def test_simultaneous_posts_lose_no_writes_or_emails(client, fake_db, email_outbox):
+    responses = await asyncio.gather(*(client.post("/api/contact", json=contact_payload(i)) for i in range(POSTS)))
+    assert Counter(r.status_code for r in responses) == {200: POSTS}
+    await email_dispatcher.join()
+
+    returned_ids = {r.json()["id"] for r in responses}
+    stored = fake_db.contact_submissions.docs
+    assert len(returned_ids) == POSTS
+    assert {doc["id"] for doc in stored} == returned_ids
+    assert len(stored) == POSTS
+
+    # One admin notification and one confirmation per submission, each recorded on its submission
+    recipients = Counter(mail["to"] for mail in email_outbox.sent)
+    assert recipients["admin@techyhive.test"] == POSTS
+    assert all(recipients[f"client{i}@example.com"] == 1 for i in range(POSTS))
+    assert all(sorted(m["kind"] for m in doc["email_messages"]) == ["admin", "user"] for doc in stored)
+    recorded = {m["message_id"] for doc in stored for m in doc["email_messages"]}
+    assert recorded == {mail["message_id"] for mail in email_outbox.sent}
+    assert admission_controller.pending_emails == 0
+
+    listed = (await client.get("/api/contact")).json()
+    assert {s["id"] for s in listed} == returned_ids
+
+
+async def test_shed_posts_are_not_half_written(client, fake_db, email_outbox, monkeypatch):
+    monkeypatch.setenv("ADMISSION_CONTACT_CONCURRENCY", "4")
+    monkeypatch.setenv("ADMISSION_CONTACT_QUEUE", "8")
+    monkeypatch.setenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "0.05")
+    admission_controller.__init__()
+
+    responses = await asyncio.gather(*(client.post("/api/contact", json=contact_payload(i)) for i in range(POSTS)))
+    statuses = Counter(r.status_code for r in responses)
+    assert set(statuses) <= {200, 503}
+    assert statuses[503] > 0
+    assert all(r.headers["Retry-After"] for r in responses if r.status_code == 503)
+
+    await email_dispatcher.join()
+    # Every accepted post was stored and emailed; every shed one left no trace
+    accepted = {r.json()["id"] for r in responses if r.status_code == 200}
+    assert {doc["id"] for doc in fake_db.contact_submissions.docs} == accepted
+    assert len(email_outbox.sent) == 2 * len(accepted)
+    assert admission_controller.stats()["routes"]["contact_write"]["in_flight"] == 0
+
+
+async def test_concurrent_status_updates_and_reads(client, fake_db):
+    created = await asyncio.gather(*(client.post("/api/contact", json=contact_payload(i)) for i in range(50)))
+    ids = [r.json()["id"] for r in created]
+
+    statuses = ["contacted", "completed"]
+    results = await asyncio.gather(
+        *(client.patch(f"/api/contact/{sid}/status", json={"status": statuses[i % 2]}) for i, sid in enumerate(ids)),
+        *(client.get("/api/contact") for _ in range(50)),
+    )
+    assert all(r.status_code == 200 for r in results)
+
+    by_id = {doc["id"]: doc["status"] for doc in fake_db.contact_submissions.docs}
+    assert by_id == {sid: statuses[i % 2] for i, sid in enumerate(ids)}
+
+
+async def test_concurrent_event_batches(client, fake_db, ingestor):
+    created = await asyncio.gather(*(client.post("/api/contact", json=contact_payload(i)) for i in range(100)))
+    assert all(r.status_code == 200 for r in created)
+    await email_dispatcher.join()
+    message_ids = [m["message_id"] for doc in fake_db.contact_submissions.docs for m in doc["email_messages"]]
+
+    batches = [
+        [{"event": name, "timestamp": t, "sg_message_id": f"{mid}.x"} for mid in message_ids]
+        for name, t in (("processed", 10), ("delivered", 20), ("open", 30))
+    ]
+    # Reverse order of arrival: the newest events must still win
+    responses = await asyncio.gather(*(client.post("/api/email/events", json=batch) for batch in reversed(batches)))
+    assert all(r.status_code == 202 for r in responses)
+    await wait_for(lambda: ingestor.applied == 3 * len(message_ids))
+
+    assert all(
+        (m["status"], m["event_at"]) == ("open", 30)
+        for doc in fake_db.contact_submissions.docs for m in doc["email_messages"]
+    )
@@ -0,0 +1,424 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from admission import BucketTable, admission_controller
+from email_dispatch import email_dispatcher
+from retention import CONTACT_ARCHIVE
+from spam_filter import BloomFilter, SpamFilter, spam_filter
+
+from tests.helpers import contact_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_submission_stores_and_emails(client, fake_db, email_outbox):
+    response = await client.post("/api/contact", json=contact_payload(1), headers={"X-Request-ID": "req-contact1"})
+    assert response.status_code == 200
+    created = response.json()
+    assert created["status"] == "pending"
+    assert created["updated_at"] == created["timestamp"]
+
+    stored = fake_db.contact_submissions.docs
+    assert [doc["id"] for doc in stored] == [created["id"]]
+    assert "website" not in stored[0] and "form_token" not in stored[0]
+
+    await email_dispatcher.join()
+    assert sorted(mail["to"] for mail in email_outbox.sent) == ["admin@techyhive.test", "client1@example.com"]
+    admin_mail = next(mail for mail in email_outbox.sent if mail["to"] == "admin@techyhive.test")
+    assert "Client 1" in admin_mail["subject"]
+    assert "Need a modern e-commerce website" in admin_mail["html"]
+
+    messages = {m["kind"]: m for m in stored[0]["email_messages"]}
+    assert set(messages) == {"admin", "user"}
+    assert {m["message_id"] for m in messages.values()} == {mail["message_id"] for mail in email_outbox.sent}
+    assert admission_controller.pending_emails == 0
+
+
+async def test_email_payloads_are_prebuilt(client, email_outbox):
+    await client.post("/api/contact", json=contact_payload(16), headers={"X-Request-ID": "req-contact16"})
+    await email_dispatcher.join()
+
+    user_mail = next(mail for mail in email_outbox.sent if mail["to"] == "client16@example.com")
+    assert user_mail["payload"] == {
+        "personalizations": [{"to": [{"email": "client16@example.com"}], "subject": user_mail["subject"]}],
+        "from": {"email": email_outbox.from_email, "name": email_outbox.from_name},
+        "content": [{"type": "text/html", "value": user_mail["html"]}],
+        # Captured from the request when the email was queued
+        "custom_args": {"request_id": "req-contact16"},
+    }
+    assert "Client 16" in user_mail["html"]
+
+    stats = (await client.get("/api/debug/email-dispatch")).json()
+    assert (stats["queued"], stats["sent"], stats["failed"], stats["backlog"]) == (2, 2, 0, 0)
+    assert set(stats["stage_seconds"]) == {"render", "serialize", "queue", "send"}
+
+
+async def test_failed_email_is_not_recorded(client, fake_db, email_outbox):
+    email_outbox.fail_for.add("client2@example.com")
+    response = await client.post("/api/contact", json=contact_payload(2))
+    assert response.status_code == 200
+    await email_dispatcher.join()
+    assert email_dispatcher.failed == 1
+    assert [m["kind"] for m in fake_db.contact_submissions.docs[0]["email_messages"]] == ["admin"]
+
+
+@pytest.mark.parametrize("overrides", [
+    {"email": "not-an-email"},
+    {"description": "too short"},
+    {"name": ""},
+    {"name": "x" * 101},
+    {"phone": "call me maybe"},
+    {"project_type": "   "},
+])
+async def test_invalid_submission_rejected(client, fake_db, email_outbox, overrides):
+    response = await client.post("/api/contact", json=contact_payload(**overrides))
+    assert response.status_code == 422
+    assert fake_db.contact_submissions.docs == []
+    assert email_outbox.sent == []
+
+
+async def test_oversized_body_rejected(client, fake_db):
+    payload = contact_payload(description="x" * (70 * 1024))
+    response = await client.post("/api/contact", json=payload)
+    assert response.status_code == 413
+    assert fake_db.contact_submissions.docs == []
+
+
+async def chunked(body: bytes, chunk_size: int, sent: list):
+    """Request body without Content-Length; records how many chunks the server pulled"""
+    for start in range(0, len(body), chunk_size):
+        sent.append(start)
+        yield body[start:start + chunk_size]
+
+
+async def test_oversized_chunked_body_rejected_early(client, fake_db):
+    body = json.dumps(contact_payload(description="x" * (200 * 1024))).encode()
+    sent = []
+    response = await client.post("/api/contact", content=chunked(body, 16 * 1024, sent),
+                                 headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert "content-length" not in {k.lower() for k in response.request.headers}
+    # Reading stopped at the first chunk past the 64 KiB limit, not at the end of the body
+    assert len(sent) == 5
+    assert fake_db.contact_submissions.docs == []
+
+
+async def test_small_chunked_body_accepted(client, fake_db):
+    body = json.dumps(contact_payload(7)).encode()
+    response = await client.post("/api/contact", content=chunked(body, 64, []),
+                                 headers={"content-type": "application/json"})
+    assert response.status_code == 200
+    assert len(fake_db.contact_submissions.docs) == 1
+
+
+async def test_honeypot_submission_is_quarantined(client, fake_db, email_outbox):
+    response = await client.post("/api/contact", json=contact_payload(3, website="http://spam.example"))
+    # Indistinguishable from a real submission to the sender
+    assert response.status_code == 200
+    assert fake_db.contact_submissions.docs == []
+    assert [doc["spam_reasons"] for doc in fake_db.contact_quarantine.docs] == [["honeypot"]]
+    assert email_outbox.sent == []
+
+
+@pytest.mark.parametrize("description", [
+    "A betting prediction model for football leagues, trained on past results",
+    "Build a crypto investment tracker that syncs with major exchanges",
+    "Website for our SEO services agency, with case studies and a blog",
+    "A multiplayer casino game for mobile with virtual chips only",
+    "An NSFW/porn detection model to moderate user uploads on our platform",
+    "Sensors and dashboards to increase traffic flow at city intersections",
+    "Portfolio redesign. References: https://a.example/1 https://b.example/2 https://c.example/3",
+])
+async def test_legitimate_briefs_are_accepted(client, fake_db, email_outbox, description):
+    response = await client.post("/api/contact", json=contact_payload(4, description=description))
+    assert response.status_code == 200
+    await email_dispatcher.join()
+
+    assert [doc["spam_flagged"] for doc in fake_db.contact_submissions.docs] == [False]
+    assert fake_db.contact_quarantine.docs == []
+    assert sorted(mail["to"] for mail in email_outbox.sent) == ["admin@techyhive.test", "client4@example.com"]
+
+
+async def test_agreeing_content_signals_flag_but_keep_the_submission(client, fake_db, email_outbox):
+    description = "Cheap SEO services and backlinks: http://a.example http://b.example http://c.example"
+    response = await client.post("/api/contact", json=contact_payload(17, description=description))
+    # Nothing in the response tells the sender
+    assert response.status_code == 200
+    assert response.json()["spam_flagged"] is False
+    await email_dispatcher.join()
+
+    stored = fake_db.contact_submissions.docs
+    assert [(doc["spam_flagged"], doc["spam_reasons"]) for doc in stored] == [(True, ["links", "spam_terms"])]
+    assert fake_db.contact_quarantine.docs == []
+    # The admin hears about it; the possibly-spammer's address gets nothing
+    assert [mail["to"] for mail in email_outbox.sent] == ["admin@techyhive.test"]
+    assert "[Possible spam]" in email_outbox.sent[0]["subject"]
+
+
+async def test_quarantine_list_and_release(client, fake_db, email_outbox):
+    honeypot = contact_payload(18, website="http://spam.example")
+    quarantined = (await client.post("/api/contact", json=honeypot)).json()
+
+    listed = (await client.get("/api/contact/quarantine")).json()
+    assert [(s["id"], s["spam_reasons"]) for s in listed] == [(quarantined["id"], ["honeypot"])]
+    assert (await client.get("/api/contact")).json() == []
+
+    released = await client.post(f"/api/contact/quarantine/{quarantined['id']}/release")
+    assert released.status_code == 200
+    assert released.json()["spam_flagged"] is False
+    assert released.json()["spam_reasons"] == ["honeypot"]
+    assert (await client.get("/api/contact/quarantine")).json() == []
+    assert [s["id"] for s in (await client.get("/api/contact")).json()] == [quarantined["id"]]
+
+    assert (await client.post(f"/api/contact/quarantine/{quarantined['id']}/release")).status_code == 404
+    await email_dispatcher.join()
+    assert email_outbox.sent == []
+
+
+async def test_per_address_rate_limit(client, fake_db, monkeypatch):
+    monkeypatch.setattr(admission_controller, "email_buckets", BucketTable(rate=1 / 3600, burst=2, max_keys=10))
+    statuses = [(await client.post("/api/contact", json=contact_payload(5))).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert len(fake_db.contact_submissions.docs) == 2
+
+
+async def test_per_ip_rate_limit(client, fake_db, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ip_buckets", BucketTable(rate=1 / 3600, burst=2, max_keys=10))
+    responses = [await client.post("/api/contact", json=contact_payload(i)) for i in range(3)]
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert int(responses[2].headers["Retry-After"]) > 0
+    assert responses[2].json() == {"detail": "Too many requests"}
+    # Refused before the handler ran
+    assert len(fake_db.contact_submissions.docs) == 2
+
+
+async def test_rate_limit_keys_on_the_proxy_appended_client(client, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ip_buckets", BucketTable(rate=1 / 3600, burst=1, max_keys=10))
+
+    async def post(i: int, forwarded: str) -> int:
+        response = await client.post("/api/contact", json=contact_payload(i), headers={"X-Forwarded-For": forwarded})
+        return response.status_code
+
+    # The first entries are whatever the client sent; the proxy appends the real address last
+    assert await post(0, "198.51.100.1, 192.0.2.10") == 200
+    assert await post(1, "198.51.100.2, 192.0.2.10") == 429
+    assert await post(2, "198.51.100.1, 192.0.2.11") == 200
+
+    # Without a trusted proxy in front, the header is ignored and the peer address is the key
+    monkeypatch.setattr(admission_controller, "trust_forwarded_for", False)
+    assert await post(3, "192.0.2.12") == 200
+    assert await post(4, "192.0.2.13") == 429
+
+
+async def test_form_token(client, monkeypatch):
+    assert (await client.get("/api/contact/token")).json() == {"token": None}
+
+    monkeypatch.setattr(spam_filter, "form_secret", "s3cret")
+    monkeypatch.setattr(spam_filter, "min_submit_seconds", 0)
+    token = (await client.get("/api/contact/token")).json()["token"]
+    assert spam_filter._check_form_token(token) is None
+    assert spam_filter._check_form_token(token + "0") == "bad_form_token"
+
+
+def test_bloom_filter_has_no_false_negatives():
+    entries = [f"user{i}@spam{i % 50}.example" for i in range(5000)]
+    blocklist = BloomFilter(entries)
+    assert all(entry in blocklist for entry in entries)
+    # Built for a 0.1% false positive rate; allow generous slack for hash variance
+    assert sum(f"user{i}@legit.example" in blocklist for i in range(5000)) < 25
+
+
+async def test_blocklisted_senders_are_quarantined(client, fake_db, tmp_path, monkeypatch):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("# known spammers\nSpammer@Bad.example\n@junkmail.example\n\n", encoding="utf-8")
+    monkeypatch.setattr(spam_filter, "blocklist_path", str(path))
+    spam_filter.reload()
+    assert spam_filter.blocklist.count == 2
+
+    for i, email in enumerate(["spammer@bad.example", "anyone@JunkMail.example", "other@bad.example"]):
+        assert (await client.post("/api/contact", json=contact_payload(i, email=email))).status_code == 200
+    assert [doc["email"] for doc in fake_db.contact_quarantine.docs] == ["spammer@bad.example", "anyone@junkmail.example"]
+    assert {tuple(doc["spam_reasons"]) for doc in fake_db.contact_quarantine.docs} == {("blocklisted_sender",)}
+    # Another address at a blocked sender's domain is not blocked by the address entry
+    assert [doc["email"] for doc in fake_db.contact_submissions.docs] == ["other@bad.example"]
+
+
+def test_blocklist_reload(tmp_path, monkeypatch):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("first@spam.example\n", encoding="utf-8")
+    monkeypatch.setenv("SPAM_BLOCKLIST_PATH", str(path))
+    screen = SpamFilter()
+    assert screen.screen("first@spam.example", "Need a website") == ["blocklisted_sender"]
+    assert screen.screen("second@spam.example", "Need a website") == []
+
+    path.write_text("first@spam.example\nsecond@spam.example\n", encoding="utf-8")
+    screen.reload()
+    assert screen.screen("second@spam.example", "Need a website") == ["blocklisted_sender"]
+
+    # An unreadable file keeps the blocklist that was already loaded
+    path.unlink()
+    screen.reload()
+    assert screen.screen("first@spam.example", "Need a website") == ["blocklisted_sender"]
+
+
+async def test_get_submission(client):
+    created = (await client.post("/api/contact", json=contact_payload(6))).json()
+    await email_dispatcher.join()
+
+    response = await client.get(f"/api/contact/{created['id']}")
+    assert response.status_code == 200
+    assert response.json()["email"] == "client6@example.com"
+    assert len(response.json()["email_messages"]) == 2
+
+    assert (await client.get("/api/contact/does-not-exist")).status_code == 404
+
+
+async def test_get_submission_falls_back_to_archive(client, fake_db):
+    await fake_db[CONTACT_ARCHIVE].insert_one({
+        **contact_payload(7), "id": "archived-1", "status": "completed",
+        "timestamp": "2024-01-01T00:00:00+00:00", "archived_at": "2024-06-01T00:00:00+00:00",
+    })
+    response = await client.get("/api/contact/archived-1")
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+async def test_update_status(client):
+    created = (await client.post("/api/contact", json=contact_payload(8))).json()
+
+    response = await client.patch(f"/api/contact/{created['id']}/status", json={"status": "contacted"})
+    assert response.status_code == 200
+    updated = response.json()
+    assert updated["status"] == "contacted"
+    assert updated["updated_at"] > created["updated_at"]
+
+    assert (await client.patch(f"/api/contact/{created['id']}/status", json={"status": "lost"})).status_code == 422
+    assert (await client.patch("/api/contact/nope/status", json={"status": "completed"})).status_code == 404
+
+
+async def test_list_is_newest_first_and_paginated(client):
+    ids = [(await client.post("/api/contact", json=contact_payload(i))).json()["id"] for i in range(5)]
+
+    listed = (await client.get("/api/contact")).json()
+    assert [s["id"] for s in listed] == ids[::-1]
+
+    page = (await client.get("/api/contact", params={"limit": 2, "offset": 1})).json()
+    assert [s["id"] for s in page] == ids[::-1][1:3]
+    assert (await client.get("/api/contact", params={"limit": 0})).status_code == 422
+
+
+async def test_list_merges_archive_on_request(client, fake_db):
+    hot = (await client.post("/api/contact", json=contact_payload(9))).json()
+    await fake_db[CONTACT_ARCHIVE].insert_one({
+        **contact_payload(10), "id": "archived-2", "status": "completed",
+        "timestamp": "2024-01-01T00:00:00+00:00", "archived_at": "2024-06-01T00:00:00+00:00",
+    })
+
+    assert [s["id"] for s in (await client.get("/api/contact")).json()] == [hot["id"]]
+    merged = (await client.get("/api/contact", params={"include_archived": "true"})).json()
+    assert [s["id"] for s in merged] == [hot["id"], "archived-2"]
+
+
+async def test_list_etag_revalidation(client, fake_db):
+    await client.post("/api/contact", json=contact_payload(11))
+    # Recording the sent message ids changes the submission too
+    await email_dispatcher.join()
+
+    first = await client.get("/api/contact")
+    etag = first.headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    # Unchanged: 304 without reading storage
+    reads_before = fake_db.contact_submissions.docs
+    fake_db.contact_submissions.docs = None
+    cached = await client.get("/api/contact", headers={"If-None-Match": etag})
+    fake_db.contact_submissions.docs = reads_before
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    # Each query has its own tag
+    paged = await client.get("/api/contact", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert paged.status_code == 200
+
+    created = (await client.post("/api/contact", json=contact_payload(12))).json()
+    await email_dispatcher.join()
+    changed = await client.get("/api/contact", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["id"] == created["id"]
+
+    etag = changed.headers["ETag"]
+    await client.patch(f"/api/contact/{created['id']}/status", json={"status": "contacted"})
+    assert (await client.get("/api/contact", headers={"If-None-Match": etag})).status_code == 200
+
+
+async def test_list_since_returns_only_changes(client):
+    first = (await client.post("/api/contact", json=contact_payload(13))).json()
+    second = (await client.post("/api/contact", json=contact_payload(14))).json()
+    await email_dispatcher.join()
+
+    full = await client.get("/api/contact")
+    watermark = full.headers["X-Watermark"]
+    # The watermark trails by the safety window, so the next poll overlaps this one
+    assert datetime.fromisoformat(watermark) < datetime.fromisoformat(first["updated_at"])
+    assert [s["id"] for s in (await client.get("/api/contact", params={"since": watermark})).json()] == [
+        first["id"], second["id"],
+    ]
+
+    await client.patch(f"/api/contact/{first['id']}/status", json={"status": "completed"})
+    third = (await client.post("/api/contact", json=contact_payload(15))).json()
+    await email_dispatcher.join()
+
+    delta = await client.get("/api/contact", params={"since": watermark})
+    # Oldest change first, so deduping by id keeps the latest copy
+    latest = {s["id"]: s for s in delta.json()}
+    assert list(latest) == [second["id"], first["id"], third["id"]]
+    assert latest[first["id"]]["status"] == "completed"
+    assert delta.headers["X-Watermark"] >= watermark
+
+    # Naive watermarks are read as UTC
+    naive = (datetime.now(timezone.utc) - timedelta(hours=1)).replace(tzinfo=None).isoformat()
+    assert len((await client.get("/api/contact", params={"since": naive})).json()) == 3
+
+
+async def test_list_since_picks_up_slow_writes(client, repository, monkeypatch):
+    monkeypatch.setattr(server, "SINCE_SAFETY_WINDOW", timedelta(seconds=5))
+    watermark = (await client.get("/api/contact")).headers["X-Watermark"]
+
+    # Stamped before the poll was answered but committed after it, like a slow insert
+    stamped = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    await repository.insert({**contact_payload(17), "id": "slow", "status": "pending",
+                             "timestamp": stamped, "updated_at": stamped})
+    assert [s["id"] for s in (await client.get("/api/contact", params={"since": watermark})).json()] == ["slow"]
+
+
+async def test_list_since_pages_through_rows_sharing_a_timestamp(client, repository, monkeypatch):
+    monkeypatch.setattr(server, "SINCE_SAFETY_WINDOW", timedelta(0))
+    # A webhook batch stamps every submission it touches with the same updated_at
+    stamp = "2024-01-01T00:00:05+00:00"
+    await repository.insert_many([
+        {**contact_payload(i), "id": f"tie-{i}", "status": "pending", "timestamp": stamp, "updated_at": stamp}
+        for i in range(5)
+    ])
+
+    seen, watermarks = [], []
+    watermark = "2024-01-01T00:00:00Z"
+    for _ in range(4):
+        # Pasted back unencoded, the way a client copies the header into the next URL
+        page = await client.get(f"/api/contact?since={watermark}&limit=2")
+        assert page.status_code == 200
+        seen += [s["id"] for s in page.json()]
+        watermark = page.headers["X-Watermark"]
+        watermarks.append(watermark)
+    assert seen == ["tie-0", "tie-1", "tie-2", "tie-3", "tie-4"]
+    assert watermarks[:2] == ["2024-01-01T00:00:05Z_tie-1", "2024-01-01T00:00:05Z_tie-3"]
+    assert watermarks[2].endswith("Z") and "+" not in watermarks[2]
+
+
+async def test_list_since_rejects_a_malformed_watermark(client):
+    response = await client.get("/api/contact", params={"since": "yesterday"})
+    assert response.status_code == 422
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+import server
+from submission_events import submission_broker
+
+from tests.helpers import contact_payload, wait_for
+
+pytestmark = pytest.mark.anyio
+
+
+async def read_event_stream(headers: dict, until, timeout: float = 5.0) -> str:
+    """Drive the SSE route at the ASGI level: httpx's in-process transport buffers whole responses"""
+    body = bytearray()
+    disconnected = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+            if until(body.decode()):
+                disconnected.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/contact/stream",
+        "raw_path": b"/api/contact/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("203.0.113.7", 50000),
+        "server": ("testserver", 80),
+    }
+    await asyncio.wait_for(server.app(scope, receive, send), timeout)
+    return body.decode()
+
+
+async def test_stream_delivers_created_and_updated_events(client):
+    reader = asyncio.create_task(read_event_stream({}, until=lambda text: "event: updated" in text))
+    await wait_for(lambda: submission_broker.subscriber_count == 1)
+
+    created = (await client.post("/api/contact", json=contact_payload(1))).json()
+    await client.patch(f"/api/contact/{created['id']}/status", json={"status": "contacted"})
+
+    text = await reader
+    assert text.startswith("retry: 3000\n\n")
+    assert f"id: {submission_broker.boot_id}-1\nevent: created\n" in text
+    assert f"id: {submission_broker.boot_id}-2\nevent: updated\n" in text
+    assert created["id"] in text
+    # The disconnect unsubscribed the client
+    assert submission_broker.subscriber_count == 0
+
+
+async def test_stream_replays_after_last_event_id(client):
+    for i in range(3):
+        await client.post("/api/contact", json=contact_payload(i))
+
+    text = await read_event_stream(
+        {"Last-Event-ID": f"{submission_broker.boot_id}-1"},
+        until=lambda text: text.count("event: created") == 2,
+    )
+    assert f"id: {submission_broker.boot_id}-1\n" not in text
+    assert f"id: {submission_broker.boot_id}-3\n" in text
+
+
+async def test_stream_resets_unknown_history(client):
+    text = await read_event_stream({"Last-Event-ID": "otherboot-7"}, until=lambda text: "event: reset" in text)
+    assert "event: reset\ndata: {}" in text
+
+
+def queued(subscriber) -> list:
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait())
+    return messages
+
+
+async def test_stream_resets_when_replay_exceeds_the_queue(client, monkeypatch):
+    monkeypatch.setattr(submission_broker, "queue_size", 5)
+    for i in range(9):
+        submission_broker.publish("created", {"id": str(i)})
+
+    fits = submission_broker.subscribe(f"{submission_broker.boot_id}-4")
+    assert [m.split("\n", 1)[0] for m in queued(fits)] == [f"id: {submission_broker.boot_id}-{seq}" for seq in range(5, 10)]
+
+    overflowing = submission_broker.subscribe(f"{submission_broker.boot_id}-2")
+    assert queued(overflowing) == ["event: reset\ndata: {}\n\n"]
+    for subscriber in (fits, overflowing):
+        submission_broker.unsubscribe(subscriber)
+
+
+async def test_failed_insert_is_not_published(client, repository, monkeypatch):
+    async def broken_insert(doc):
+        raise RuntimeError("storage down")
+
+    monkeypatch.setattr(repository, "insert", broken_insert)
+    subscriber = submission_broker.subscribe()
+    assert (await client.post("/api/contact", json=contact_payload(4))).status_code == 200
+    assert subscriber.queue.empty()
+    submission_broker.unsubscribe(subscriber)
+
+
+async def test_overflowing_subscriber_is_closed_at_once(client, monkeypatch):
+    monkeypatch.setattr(submission_broker, "queue_size", 2)
+    subscriber = submission_broker.subscribe()
+    frames = submission_broker.stream(subscriber)
+    assert await frames.__anext__() == "retry: 3000\n\n"
+
+    # The stream is parked waiting for its next message when the overflow happens
+    next_frame = asyncio.ensure_future(frames.__anext__())
+    await asyncio.sleep(0)
+    for i in range(3):
+        submission_broker.publish("created", {"id": str(i)})
+    assert submission_broker.subscriber_count == 0
+    # It ends straight away instead of waiting out the keepalive interval
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(next_frame, 1)
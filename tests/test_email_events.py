@@ -0,0 +1,244 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from email_dispatch import email_dispatcher
+from email_events import EMAIL_EVENTS, SIGNATURE_HEADER, TIMESTAMP_HEADER, email_event_ingestor
+
+from tests.helpers import contact_payload, wait_for
+
+pytestmark = pytest.mark.anyio
+
+
+def event(message_id: str, name: str, timestamp: int) -> dict:
+    return {
+        "email": "client@example.com",
+        "event": name,
+        "timestamp": timestamp,
+        "sg_event_id": f"{message_id}-{name}-{timestamp}",
+        "sg_message_id": f"{message_id}.filterdrecv-5645d9c87f-abcde.1.0",
+    }
+
+
+async def create_with_messages(client, fake_db, i: int = 0) -> dict:
+    created = (await client.post("/api/contact", json=contact_payload(i))).json()
+    await email_dispatcher.join()
+    doc = next(doc for doc in fake_db.contact_submissions.docs if doc["id"] == created["id"])
+    return {m["kind"]: m["message_id"] for m in doc["email_messages"]} | {"id": created["id"]}
+
+
+async def test_events_update_message_status(client, fake_db, ingestor):
+    ids = await create_with_messages(client, fake_db)
+    batch = [
+        event(ids["user"], "processed", 100),
+        event(ids["user"], "delivered", 105),
+        event(ids["admin"], "processed", 100),
+        event(ids["admin"], "bounce", 110),
+        {"event": "group_unsubscribe", "timestamp": 120, "sg_message_id": f"{ids['user']}.x"},
+    ]
+    response = await client.post("/api/email/events", json=batch)
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 5}
+    await wait_for(lambda: ingestor.applied == 5)
+
+    submission = (await client.get(f"/api/contact/{ids['id']}")).json()
+    statuses = {m["kind"]: (m["status"], m["event_at"]) for m in submission["email_messages"]}
+    assert statuses == {"user": ("delivered", 105), "admin": ("bounce", 110)}
+    # Raw events are kept, with a received_at for the TTL index
+    assert len(fake_db[EMAIL_EVENTS].docs) == 5
+    assert all("received_at" in doc for doc in fake_db[EMAIL_EVENTS].docs)
+
+
+async def test_out_of_order_events_are_ignored(client, fake_db, ingestor):
+    ids = await create_with_messages(client, fake_db)
+    await client.post("/api/email/events", json=[event(ids["user"], "open", 200)])
+    await wait_for(lambda: ingestor.applied == 1)
+    await client.post("/api/email/events", json=[event(ids["user"], "delivered", 150)])
+    await wait_for(lambda: ingestor.applied == 2)
+
+    submission = (await client.get(f"/api/contact/{ids['id']}")).json()
+    user = next(m for m in submission["email_messages"] if m["kind"] == "user")
+    assert (user["status"], user["event_at"]) == ("open", 200)
+
+
+async def test_same_second_events_follow_the_lifecycle(client, fake_db, ingestor):
+    ids = await create_with_messages(client, fake_db)
+    # Within one batch, processed listed after delivered from the same second
+    await client.post("/api/email/events", json=[
+        event(ids["user"], "delivered", 300), event(ids["user"], "processed", 300),
+        event(ids["admin"], "open", 300), event(ids["admin"], "delivered", 300),
+    ])
+    await wait_for(lambda: ingestor.applied == 4)
+    # And across batches: a later batch does not win a tie by arriving later
+    await client.post("/api/email/events", json=[event(ids["user"], "processed", 300)])
+    await wait_for(lambda: ingestor.applied == 5)
+
+    submission = (await client.get(f"/api/contact/{ids['id']}")).json()
+    statuses = {m["kind"]: (m["status"], m["event_at"]) for m in submission["email_messages"]}
+    assert statuses == {"user": ("delivered", 300), "admin": ("open", 300)}
+
+
+async def test_events_invalidate_list_etag(client, fake_db, ingestor):
+    ids = await create_with_messages(client, fake_db)
+    etag = (await client.get("/api/contact")).headers["ETag"]
+
+    await client.post("/api/email/events", json=[event(ids["user"], "delivered", 100)])
+    await wait_for(lambda: ingestor.applied == 1)
+    assert (await client.get("/api/contact", headers={"If-None-Match": etag})).status_code == 200
+
+
+async def test_events_for_unknown_messages_are_harmless(client, ingestor):
+    response = await client.post("/api/email/events", json=[event("unknownmessage", "delivered", 100)])
+    assert response.status_code == 202
+    await wait_for(lambda: ingestor.applied == 1)
+    assert ingestor.failed_batches == 0
+
+
+async def test_raw_store_failure_still_invalidates_list_etag(client, fake_db, ingestor, monkeypatch):
+    ids = await create_with_messages(client, fake_db)
+    etag = (await client.get("/api/contact")).headers["ETag"]
+
+    async def broken_insert_many(docs, ordered=True):
+        raise RuntimeError("raw events collection unavailable")
+
+    monkeypatch.setattr(fake_db[EMAIL_EVENTS], "insert_many", broken_insert_many)
+    await client.post("/api/email/events", json=[event(ids["user"], "delivered", 100)])
+    await wait_for(lambda: ingestor.applied == 1)
+
+    assert ingestor.raw_store_failures == 1 and ingestor.failed_batches == 0
+    refreshed = await client.get("/api/contact", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert {m["kind"]: m["status"] for m in refreshed.json()[0]["email_messages"]}["user"] == "delivered"
+
+
+async def test_failed_apply_is_retried(client, fake_db, ingestor, repository, monkeypatch):
+    ids = await create_with_messages(client, fake_db)
+    monkeypatch.setattr(ingestor, "retry_seconds", 0)
+    apply_email_events = repository.apply_email_events
+    failures = [RuntimeError("storage blip")] * 2
+
+    async def flaky(updates):
+        if failures:
+            raise failures.pop()
+        await apply_email_events(updates)
+
+    monkeypatch.setattr(repository, "apply_email_events", flaky)
+    await client.post("/api/email/events", json=[event(ids["user"], "delivered", 100)])
+    await wait_for(lambda: ingestor.applied == 1)
+
+    assert (ingestor.retried_batches, ingestor.failed_batches) == (2, 0)
+    submission = (await client.get(f"/api/contact/{ids['id']}")).json()
+    assert {m["kind"]: m["status"] for m in submission["email_messages"]}["user"] == "delivered"
+    # Raw events are stored once, after the update went through
+    assert len(fake_db[EMAIL_EVENTS].docs) == 1
+
+
+async def test_failed_apply_gives_up_after_max_attempts(client, ingestor, repository, monkeypatch):
+    monkeypatch.setattr(ingestor, "retry_seconds", 0)
+    monkeypatch.setattr(ingestor, "max_attempts", 3)
+
+    async def broken(updates):
+        raise RuntimeError("storage down")
+
+    monkeypatch.setattr(repository, "apply_email_events", broken)
+    await client.post("/api/email/events", json=[event("m", "delivered", 100)])
+    await wait_for(lambda: ingestor.failed_batches == 1)
+    assert ingestor.retried_batches == 2
+    await ingestor.drain()
+    assert ingestor.backlog == 0
+
+
+async def test_fresh_batches_keep_their_own_attempts(client, fake_db, ingestor, repository, monkeypatch):
+    ids = await create_with_messages(client, fake_db)
+    monkeypatch.setattr(ingestor, "retry_seconds", 0.1)
+    monkeypatch.setattr(ingestor, "max_attempts", 2)
+    apply_email_events = repository.apply_email_events
+    calls = []
+
+    async def flaky(updates):
+        calls.append(updates)
+        if len(calls) <= 2:
+            raise RuntimeError("storage blip")
+        await apply_email_events(updates)
+
+    monkeypatch.setattr(repository, "apply_email_events", flaky)
+    await client.post("/api/email/events", json=[event(ids["admin"], "delivered", 100)])
+    await wait_for(lambda: len(calls) == 1)
+    # Arrives during the first batch's backoff; its own first failure must not be its last
+    await client.post("/api/email/events", json=[event(ids["user"], "delivered", 100)])
+    await wait_for(lambda: ingestor.applied == 2)
+
+    assert (ingestor.retried_batches, ingestor.failed_batches) == (2, 0)
+    submission = (await client.get(f"/api/contact/{ids['id']}")).json()
+    assert {m["kind"]: m["status"] for m in submission["email_messages"]} == {"admin": "delivered", "user": "delivered"}
+
+
+async def test_drain_applies_queued_batches(client, fake_db, repository):
+    ids = await create_with_messages(client, fake_db)
+    # Queued while the ingestor is not running yet, as at shutdown behind a slow batch
+    await client.post("/api/email/events", json=[event(ids["user"], "delivered", 100)])
+    await client.post("/api/email/events", json=[{"event": "group_unsubscribe", "timestamp": 1}])
+    assert email_event_ingestor.backlog == 2
+
+    task = asyncio.create_task(email_event_ingestor.run(repository, fake_db))
+    await email_event_ingestor.drain()
+    assert email_event_ingestor.backlog == 0
+    assert email_event_ingestor.applied == 2
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def test_untracked_only_batch_skips_raw_insert(client, fake_db, ingestor):
+    await client.post("/api/email/events", json=["not an event", 42])
+    await wait_for(lambda: ingestor.applied == 2)
+    assert fake_db[EMAIL_EVENTS].docs == []
+    assert ingestor.raw_store_failures == 0
+
+
+@pytest.mark.parametrize("body", [b"{}", b"not json", b'"delivered"'])
+async def test_non_array_body_rejected(client, body):
+    response = await client.post("/api/email/events", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+
+
+async def test_full_backlog_asks_sendgrid_to_retry(client, monkeypatch):
+    monkeypatch.setattr(email_event_ingestor, "submit", lambda events: False)
+    response = await client.post("/api/email/events", json=[event("m", "delivered", 1)])
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+async def test_signed_webhook(client, monkeypatch):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    monkeypatch.setattr(email_event_ingestor, "public_key", private_key.public_key())
+    body = json.dumps([event("m", "delivered", 1)]).encode()
+    timestamp = "1700000000"
+    signature = base64.b64encode(private_key.sign(timestamp.encode() + body, ec.ECDSA(hashes.SHA256()))).decode()
+
+    unsigned = await client.post("/api/email/events", content=body)
+    assert unsigned.status_code == 403
+
+    tampered = await client.post("/api/email/events", content=body + b" ",
+                                 headers={SIGNATURE_HEADER: signature, TIMESTAMP_HEADER: timestamp})
+    assert tampered.status_code == 403
+
+    signed = await client.post("/api/email/events", content=body,
+                               headers={SIGNATURE_HEADER: signature, TIMESTAMP_HEADER: timestamp})
+    assert signed.status_code == 202
+
+    # SendGrid hands out the key as base64 DER, which is what the env var holds
+    der = private_key.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    monkeypatch.setenv("SENDGRID_WEBHOOK_PUBLIC_KEY", base64.b64encode(der).decode())
+    email_event_ingestor.__init__()
+    assert email_event_ingestor.verify(body, signature, timestamp)
+
+
+async def test_large_batches_allowed_past_form_body_limit(client, ingestor):
+    batch = [event(f"message{i:05d}", "delivered", i) for i in range(1000)]
+    response = await client.post("/api/email/events", json=batch)
+    assert response.status_code == 202
+    await wait_for(lambda: ingestor.applied == 1000)
@@ -0,0 +1,141 @@
+"""Contract tests run against every storage engine create_repository can return"""
+
+import pytest
+
+from repository import InMemorySubmissionRepository, MongoSubmissionRepository, SQLiteSubmissionRepository
+
+from tests.fakes import FakeMotorDatabase
+from tests.helpers import contact_payload
+
+pytestmark = pytest.mark.anyio
+
+
+def submission(i: int, **overrides) -> dict:
+    stamp = f"2024-01-01T00:00:{i:02d}+00:00"
+    return {**contact_payload(i), "id": f"sub-{i}", "status": "pending", "timestamp": stamp, "updated_at": stamp,
+            "email_messages": [], **overrides}
+
+
+@pytest.fixture(params=["mongo", "sqlite", "memory"])
+async def repo(request, tmp_path):
+    if request.param == "mongo":
+        repository = MongoSubmissionRepository(FakeMotorDatabase())
+    elif request.param == "sqlite":
+        repository = SQLiteSubmissionRepository(str(tmp_path / "submissions.db"))
+    else:
+        repository = InMemorySubmissionRepository()
+    await repository.setup()
+    yield repository
+    await repository.close()
+
+
+def message_states(doc: dict) -> dict:
+    return {m["message_id"]: (m["status"], m["event_at"]) for m in doc.get("email_messages", [])}
+
+
+async def test_insert_get_and_list(repo):
+    await repo.insert(submission(0))
+    await repo.insert_many([submission(i) for i in range(1, 5)])
+
+    assert (await repo.get("sub-2"))["email"] == "client2@example.com"
+    assert await repo.get("missing") is None
+    assert [s["id"] for s in await repo.list()] == ["sub-4", "sub-3", "sub-2", "sub-1", "sub-0"]
+    assert [s["id"] for s in await repo.list(limit=2, offset=1)] == ["sub-3", "sub-2"]
+
+
+async def test_update_status(repo):
+    await repo.insert(submission(0))
+    updated = await repo.update_status("sub-0", "contacted")
+    assert updated["status"] == "contacted"
+    assert updated["updated_at"] > submission(0)["updated_at"]
+    assert (await repo.get("sub-0"))["status"] == "contacted"
+    assert await repo.update_status("missing", "contacted") is None
+
+
+async def test_changed_since_is_oldest_change_first(repo):
+    await repo.insert_many([submission(i) for i in range(3)])
+    await repo.update_status("sub-0", "completed")
+
+    changed = await repo.changed_since(submission(1)["updated_at"])
+    assert [s["id"] for s in changed] == ["sub-1", "sub-2", "sub-0"]
+    assert [s["id"] for s in await repo.changed_since(submission(2)["updated_at"], limit=1)] == ["sub-2"]
+    assert [s["id"] for s in await repo.changed_since(changed[-1]["updated_at"])] == ["sub-0"]
+
+
+async def test_changed_since_pages_through_rows_sharing_a_timestamp(repo):
+    stamp = submission(5)["updated_at"]
+    await repo.insert_many([submission(i, updated_at=stamp) for i in range(5)])
+
+    # More tied rows than the limit: the id cursor must move the page past them
+    seen, cursor = [], (stamp, "")
+    while page := await repo.changed_since(*cursor, limit=2):
+        seen += [s["id"] for s in page]
+        cursor = (page[-1]["updated_at"], page[-1]["id"])
+    assert seen == ["sub-0", "sub-1", "sub-2", "sub-3", "sub-4"]
+
+
+async def test_quarantine_is_kept_apart_until_released(repo):
+    await repo.insert_quarantined(submission(0), ["honeypot"])
+    await repo.insert_quarantined(submission(1), ["blocklisted_sender", "links"])
+    assert await repo.get("sub-0") is None
+    assert await repo.list() == []
+    assert [(s["id"], s["spam_reasons"]) for s in await repo.list_quarantined()] == [
+        ("sub-1", ["blocklisted_sender", "links"]), ("sub-0", ["honeypot"]),
+    ]
+
+    released = await repo.release_quarantined("sub-0")
+    assert (released["spam_flagged"], released["spam_reasons"]) == (False, ["honeypot"])
+    assert released["updated_at"] > submission(0)["updated_at"]
+    assert [s["id"] for s in await repo.list()] == ["sub-0"]
+    assert [s["id"] for s in await repo.list_quarantined()] == ["sub-1"]
+    assert await repo.release_quarantined("sub-0") is None
+
+
+async def test_recorded_messages_move_the_watermark(repo):
+    await repo.insert_many([submission(0), submission(1)])
+    await repo.record_email_message("sub-0", "admin", "m-admin")
+    await repo.record_email_message("sub-0", "user", "m-user")
+
+    doc = await repo.get("sub-0")
+    assert message_states(doc) == {"m-admin": ("sent", 0), "m-user": ("sent", 0)}
+    assert [s["id"] for s in await repo.changed_since(submission(1)["updated_at"])] == ["sub-1", "sub-0"]
+    # Messages come back on list pages too, attached to the right submission
+    listed = {s["id"]: message_states(s) for s in await repo.list()}
+    assert listed == {"sub-1": {}, "sub-0": {"m-admin": ("sent", 0), "m-user": ("sent", 0)}}
+
+
+async def test_apply_email_events(repo):
+    await repo.insert_many([submission(0), submission(1)])
+    await repo.record_email_message("sub-0", "admin", "m-admin")
+    await repo.record_email_message("sub-0", "user", "m-user")
+    watermark = (await repo.get("sub-0"))["updated_at"]
+
+    await repo.apply_email_events({
+        "m-admin": {"status": "delivered", "event_at": 100},
+        "m-user": {"status": "open", "event_at": 200},
+        "unknown": {"status": "delivered", "event_at": 100},
+    })
+    assert message_states(await repo.get("sub-0")) == {"m-admin": ("delivered", 100), "m-user": ("open", 200)}
+    applied = (await repo.get("sub-0"))["updated_at"]
+    assert applied > watermark
+
+    # Older events change nothing, not even updated_at
+    await repo.apply_email_events({"m-user": {"status": "delivered", "event_at": 150}})
+    doc = await repo.get("sub-0")
+    assert message_states(doc)["m-user"] == ("open", 200)
+    assert doc["updated_at"] == applied
+    assert [s["id"] for s in await repo.changed_since(applied)] == ["sub-0"]
+
+
+async def test_same_second_events_are_ordered_by_lifecycle(repo):
+    await repo.insert(submission(0))
+    await repo.record_email_message("sub-0", "user", "m-user")
+    await repo.apply_email_events({"m-user": {"status": "delivered", "event_at": 100}})
+    stamped = (await repo.get("sub-0"))["updated_at"]
+
+    await repo.apply_email_events({"m-user": {"status": "processed", "event_at": 100}})
+    doc = await repo.get("sub-0")
+    assert (message_states(doc)["m-user"], doc["updated_at"]) == (("delivered", 100), stamped)
+
+    await repo.apply_email_events({"m-user": {"status": "bounce", "event_at": 100}})
+    assert message_states(await repo.get("sub-0"))["m-user"] == ("bounce", 100)
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from retention import CONTACT_ARCHIVE, CONTACT_SUBMISSIONS, STATUS_CHECKS, RetentionService
+
+from tests.helpers import contact_payload
+
+pytestmark = pytest.mark.anyio
+
+OLD = "2024-01-01T00:00:00+00:00"
+
+
+async def seed(fake_db, count: int):
+    for i in range(count):
+        await fake_db[CONTACT_SUBMISSIONS].insert_one(
+            {**contact_payload(i), "id": f"sub-{i}", "status": "completed", "timestamp": OLD, "updated_at": OLD}
+        )
+
+
+async def test_archive_moves_old_completed_submissions(fake_db):
+    await seed(fake_db, 3)
+    await fake_db[CONTACT_SUBMISSIONS].insert_one({**contact_payload(9), "id": "open", "status": "pending", "timestamp": OLD})
+
+    assert await RetentionService().archive_completed_submissions(fake_db) == 3
+    assert [doc["id"] for doc in fake_db[CONTACT_SUBMISSIONS].docs] == ["open"]
+    assert sorted(doc["id"] for doc in fake_db[CONTACT_ARCHIVE].docs) == ["sub-0", "sub-1", "sub-2"]
+
+
+async def test_submission_reopened_mid_archive_is_not_duplicated(fake_db):
+    await seed(fake_db, 2)
+    archive = fake_db[CONTACT_ARCHIVE]
+    copy_to_archive = archive.bulk_write
+
+    async def copy_then_reopen(requests, ordered=True):
+        await copy_to_archive(requests, ordered=ordered)
+        # An admin reopens one submission between the copy and the delete
+        await fake_db[CONTACT_SUBMISSIONS].update_one({"id": "sub-1"}, {"$set": {"status": "contacted"}})
+
+    archive.bulk_write = copy_then_reopen
+    assert await RetentionService().archive_completed_submissions(fake_db) == 1
+
+    assert [(doc["id"], doc["status"]) for doc in fake_db[CONTACT_SUBMISSIONS].docs] == [("sub-1", "contacted")]
+    assert [doc["id"] for doc in archive.docs] == ["sub-0"]
+
+
+async def test_status_checks_without_created_at_are_backfilled(fake_db):
+    checks = fake_db[STATUS_CHECKS]
+    await checks.insert_one({"id": "old", "client_name": "web", "timestamp": "2024-01-01T00:00:00.250000+00:00"})
+    await checks.insert_one({"id": "naive", "client_name": "web", "timestamp": "2024-01-02T00:00:00"})
+    await checks.insert_one({"id": "garbled", "client_name": "web", "timestamp": "yesterday"})
+    current = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    await checks.insert_one({"id": "new", "client_name": "web", "timestamp": current.isoformat(), "created_at": current})
+
+    service = RetentionService()
+    service.backfill_batch_size = 2
+    before = datetime.now(timezone.utc)
+    await service.ensure_collections(fake_db)
+
+    created = {doc["id"]: doc["created_at"] for doc in checks.docs}
+    assert created["old"] == datetime(2024, 1, 1, 0, 0, 0, 250000, tzinfo=timezone.utc)
+    assert created["naive"] == datetime(2024, 1, 2, tzinfo=timezone.utc)
+    assert created["garbled"] >= before
+    assert created["new"] == current
+    assert await service.backfill_status_created_at(fake_db) == 0
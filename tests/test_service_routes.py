@@ -0,0 +1,268 @@
+import json
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import tracing
+from log_pipeline import log_pipeline
+from profiling import PROFILE_HEADER, ProfileStore, ProfilingMiddleware, profile_store, sign_profile_token
+from tracing import tracer
+
+from tests.helpers import contact_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_root(client):
+    response = await client.get("/api/")
+    assert response.status_code == 200
+    assert response.json() == {"message": "Hello World"}
+
+
+async def test_responses_carry_request_id(client):
+    response = await client.get("/api/", headers={"X-Request-ID": "req-abc123"})
+    assert response.headers["X-Request-ID"] == "req-abc123"
+
+    generated = await client.get("/api/")
+    assert generated.headers["X-Request-ID"]
+
+
+async def test_debug_env_masks_password(client, monkeypatch):
+    monkeypatch.setenv("SMTP_PASSWORD", "hunter2")
+    response = await client.get("/api/debug/env")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["smtp_password"] == "***"
+    assert body["smtp_user"] == "admin@techyhive.test"
+
+
+async def test_debug_profile_hidden_without_token(client, monkeypatch):
+    assert (await client.get("/api/debug/profile")).status_code == 404
+
+    monkeypatch.setenv("DEBUG_TOKEN", "letmein")
+    response = await client.get("/api/debug/profile", headers={"X-Debug-Token": "wrong"})
+    assert response.status_code == 404
+
+
+async def test_debug_profile_returns_collapsed_stacks(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("DEBUG_TOKEN", "letmein")
+    monkeypatch.setattr(profile_store, "directory", tmp_path)
+    monkeypatch.setattr(profile_store, "_seq", None)
+    profile_store.write({
+        "route": "/api/contact",
+        "method": "POST",
+        "duration_ms": 1.0,
+        "profiler": "cprofile",
+        "captured_at": 0,
+        "stacks": {"create_contact_submission_(server.py:1)": 250},
+    })
+
+    response = await client.get("/api/debug/profile", headers={"X-Debug-Token": "letmein"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == "POST_/api/contact;create_contact_submission_(server.py:1) 250\n"
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.fixture
+async def profiled(tmp_path):
+    """A client whose requests pass through an enabled ProfilingMiddleware; yields (client, middleware)"""
+    middleware = ProfilingMiddleware(ok_app)
+    middleware.enabled = True
+    middleware.store = ProfileStore(str(tmp_path), 10)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://testserver") as http_client:
+        yield http_client, middleware
+
+
+async def test_event_stream_is_never_profiled(profiled):
+    client, middleware = profiled
+    middleware.sample_rate = 1.0
+    await client.get("/api/contact/stream")
+    assert middleware.store.read() == []
+    await client.get("/api/contact")
+    assert [record["route"] for record in middleware.store.read()] == ["/api/contact"]
+
+
+async def test_profiling_samples_requests(profiled):
+    client, middleware = profiled
+    await client.get("/api/")
+    assert middleware.store.read() == []
+
+    middleware.sample_rate = 1.0
+    await client.post("/api/contact")
+    [record] = middleware.store.read()
+    assert (record["method"], record["route"]) == ("POST", "/api/contact")
+    # pyinstrument when installed, else the cProfile fallback
+    assert record["profiler"] in ("pyinstrument", "cprofile")
+
+
+async def test_profiling_honours_only_valid_signed_headers(profiled):
+    client, middleware = profiled
+    middleware.signing_key = "k3y"
+
+    async def profiled_with(token: str) -> bool:
+        before = len(middleware.store.read())
+        await client.get("/api/", headers={PROFILE_HEADER: token})
+        return len(middleware.store.read()) > before
+
+    assert await profiled_with(sign_profile_token("k3y"))
+    assert not await profiled_with(sign_profile_token("other-key"))
+    assert not await profiled_with(sign_profile_token("k3y", ttl_seconds=-1))
+    assert not await profiled_with("not-a-token")
+    # A signed header means nothing when no signing key is configured
+    middleware.signing_key = ""
+    assert not await profiled_with(sign_profile_token("k3y"))
+
+
+async def test_debug_admission_stats(client):
+    response = await client.get("/api/debug/admission")
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["routes"]) == {"contact_write", "write", "read"}
+    assert body["emails"]["pending"] == 0
+
+
+async def test_debug_email_events_stats(client):
+    response = await client.get("/api/debug/email-events")
+    assert response.status_code == 200
+    assert response.json() == {
+        "received": 0, "applied": 0, "backlog_batches": 0, "retried_batches": 0, "failed_batches": 0,
+        "raw_store_failures": 0,
+    }
+
+
+async def test_debug_logging_stats(client):
+    response = await client.get("/api/debug/logging")
+    assert response.status_code == 200
+    assert set(response.json()) == {"queue_depth", "queue_size", "dropped"}
+
+
+def test_uvicorn_loggers_go_through_the_queue():
+    # As left by uvicorn's default LOGGING_CONFIG
+    access = logging.getLogger("uvicorn.access")
+    access.addHandler(logging.StreamHandler())
+    access.propagate = False
+
+    log_pipeline.adopt_server_loggers()
+    assert access.handlers == [] and access.propagate
+    assert log_pipeline.queue_handler in logging.getLogger().handlers
+
+
+async def test_status_checks_round_trip(client, fake_db):
+    for name in ("web", "worker", "web"):
+        response = await client.post("/api/status", json={"client_name": name})
+        assert response.status_code == 200
+        assert response.json()["client_name"] == name
+
+    response = await client.get("/api/status", params={"limit": 2})
+    assert response.status_code == 200
+    checks = response.json()
+    assert len(checks) == 2
+    assert checks[0]["timestamp"] >= checks[1]["timestamp"]
+    assert all("created_at" not in check for check in checks)
+    # Native datetime kept for the TTL index
+    assert all(isinstance(doc["created_at"], datetime) for doc in fake_db.status_checks.docs)
+
+
+async def test_status_requires_client_name(client):
+    assert (await client.post("/api/status", json={})).status_code == 422
+
+
+async def test_status_rollups_count_heartbeats(client):
+    for name in ("web", "web", "worker"):
+        await client.post("/api/status", json={"client_name": name})
+
+    response = await client.get("/api/status/rollup", params={"granularity": "minute", "client_name": "web"})
+    assert response.status_code == 200
+    rollups = response.json()
+    assert len(rollups) == 1
+    assert rollups[0]["count"] == 2
+
+    hourly = (await client.get("/api/status/rollup")).json()
+    assert sorted((r["client_name"], r["count"]) for r in hourly) == [("web", 2), ("worker", 1)]
+
+    future = (datetime.now(timezone.utc) + timedelta(hours=2)).isoformat()
+    assert (await client.get("/api/status/rollup", params={"since": future})).json() == []
+    assert (await client.get("/api/status/rollup", params={"granularity": "day"})).status_code == 422
+
+
+async def test_spans_are_not_built_without_an_exporter(client, monkeypatch):
+    captured = []
+    monkeypatch.setattr(tracer, "finish_segment", captured.append)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+
+    await client.post("/api/contact", json=contact_payload(1))
+    assert captured == []
+
+    monkeypatch.setattr(tracer, "export_path", "/dev/null")
+    await client.post("/api/contact", json=contact_payload(2))
+    names = {span.name for segment in captured for span in segment}
+    assert {"POST /api/contact", "request.validate", "storage.insert"} <= names
+
+
+async def test_validation_span_covers_parsing_and_validation(client, monkeypatch):
+    captured = []
+    monkeypatch.setattr(tracer, "finish_segment", captured.append)
+    monkeypatch.setattr(tracer, "export_path", "/dev/null")
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+
+    await client.post("/api/contact", json=contact_payload(1))
+    spans = {span.name: span for span in captured[0]}
+    validate, insert = spans["request.validate"], spans["storage.insert"]
+    assert validate.parent_id == spans["POST /api/contact"].span_id
+    assert validate.attributes["route"] == "/api/contact"
+    # Closed as the handler is entered, so it does not include the handler's own work
+    assert validate.end_ns <= insert.start_ns
+
+    captured.clear()
+    assert (await client.post("/api/contact", json={"name": "x"})).status_code == 422
+    validate = next(span for span in captured[0] if span.name == "request.validate")
+    assert validate.error.startswith("RequestValidationError")
+
+
+async def test_sampled_segments_are_exported(client, monkeypatch, tmp_path):
+    export_path = tmp_path / "spans.jsonl"
+    posted = []
+
+    def collector(request: httpx.Request) -> httpx.Response:
+        posted.append((str(request.url), json.loads(request.content)))
+        return httpx.Response(200)
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(tracing.httpx, "AsyncClient",
+                        lambda **kwargs: real_client(transport=httpx.MockTransport(collector), **kwargs))
+    monkeypatch.setattr(tracer, "_pending", deque(maxlen=10))
+    monkeypatch.setattr(tracer, "export_path", str(export_path))
+    monkeypatch.setattr(tracer, "otlp_endpoint", "http://collector:4318/")
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+
+    # Neither sampled nor slow: nothing is buffered
+    await client.post("/api/contact", json=contact_payload(1))
+    await tracer.flush()
+    assert not export_path.exists() and posted == []
+
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    response = await client.post("/api/contact", json=contact_payload(2), headers={"X-Request-ID": "req-export"})
+    await tracer.flush()
+
+    spans = [json.loads(line) for line in export_path.read_text(encoding="utf-8").splitlines()]
+    request_spans = [span for span in spans if span["request_id"] == "req-export"]
+    assert {"POST /api/contact", "request.validate", "storage.insert"} <= {span["name"] for span in request_spans}
+    assert len({span["trace_id"] for span in request_spans}) == 1
+    assert response.headers["X-Request-ID"] == "req-export"
+
+    [(url, payload)] = posted
+    assert url == "http://collector:4318/v1/traces"
+    [resource] = payload["resourceSpans"]
+    assert resource["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": tracer.service_name}}]
+    otlp = {span["name"]: span for span in resource["scopeSpans"][0]["spans"]}
+    assert otlp["request.validate"]["parentSpanId"] == otlp["POST /api/contact"]["spanId"]
+    assert "parentSpanId" not in otlp["POST /api/contact"]
+    assert tracer.exported_segments >= 1